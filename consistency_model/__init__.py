@@ -4,9 +4,13 @@ __author__ = "Alex Liabakh"
 
 from .tools import (
     ConsistencyChecker,
+    ValidationPlan,
+    ScanCursors,
+    RollingScan,
     register_consistency,
     consistency_error,
     consistency_validator,
+    consistency_query_validator,
     gen_validators_by_model,
     gen_validators_by_app,
     gen_validators_by_func,
@@ -14,3 +18,6 @@ from .tools import (
     gen_consistency_errors,
     monitoring_iteration,
 )
+from .timings import ValidationTimings, ValidationQueries
+from .profiling import ValidationProfile
+from .daemon import MonitoringDaemon
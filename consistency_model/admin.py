@@ -1,6 +1,88 @@
+import json
+from typing import Any, Dict, Optional
+
 from django.contrib import admin
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import ConsistencyFail, ConsistencyFailDaily
+from .settings import ADMIN_ESTIMATED_COUNT_THRESHOLD, ADMIN_SUMMARY_CACHE_SECONDS
+
+SUMMARY_CACHE_KEY = "consistency_model.fails_summary"
+
+
+def get_estimated_count(queryset) -> Optional[int]:
+    """
+    number of rows of @queryset estimated by the query planner of PostgreSQL,
+    None for other backends
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
 
-from .models import ConsistencyFail
+
+class EstimatedCountPaginator(Paginator):
+    """
+    uses the estimated number of rows instead of COUNT(*) on big tables
+    (above CONSISTENCY_ADMIN_ESTIMATED_COUNT_THRESHOLD rows)
+    """
+
+    @cached_property
+    def count(self) -> int:
+        if isinstance(self.object_list, models.QuerySet):
+            estimate = get_estimated_count(self.object_list)
+            if estimate is not None and estimate >= ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+def get_fails_summary() -> Dict[str, Any]:
+    """
+    number of unresolved fails per validator and per model,
+    cached for CONSISTENCY_ADMIN_SUMMARY_CACHE_SECONDS
+    """
+    summary = cache.get(SUMMARY_CACHE_KEY)
+    if summary is not None:
+        return summary
+
+    unresolved_fails = ConsistencyFail.objects.filter(resolved=False).order_by()
+    by_validator = list(
+        unresolved_fails.values("validator_name")
+        .annotate(count=models.Count("pk"))
+        .order_by("-count", "validator_name")
+    )
+    by_model = [
+        {
+            "model": ContentType.objects.get_for_id(row["content_type"]),
+            "count": row["count"],
+        }
+        for row in unresolved_fails.values("content_type")
+        .annotate(count=models.Count("pk"))
+        .order_by("-count")
+    ]
+    summary = {
+        "by_validator": by_validator,
+        "by_model": by_model,
+        "total": sum(row["count"] for row in by_model),
+        "created_on": timezone.now(),
+    }
+    cache.set(SUMMARY_CACHE_KEY, summary, ADMIN_SUMMARY_CACHE_SECONDS)
+    return summary
 
 
 class ConsistencyFailAdmin(admin.ModelAdmin):
@@ -13,6 +95,46 @@ class ConsistencyFailAdmin(admin.ModelAdmin):
     ]
     list_filter = ["resolved"]
     search_fields = ["validator_name"]
+    paginator = EstimatedCountPaginator
+    # no COUNT(*) of the whole table for filtered pages
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # the objects are loaded with one query per model
+        return super().get_queryset(request).prefetch_related("content_object")
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path(
+                "summary/",
+                self.admin_site.admin_view(self.summary_view),
+                name="%s_%s_summary" % info,
+            )
+        ] + super().get_urls()
+
+    def summary_view(self, request):
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title="Unresolved consistency fails",
+            **get_fails_summary()
+        )
+        return TemplateResponse(
+            request, "admin/consistency_model/consistencyfail/summary.html", context
+        )
 
 
 admin.site.register(ConsistencyFail, ConsistencyFailAdmin)
+
+
+class ConsistencyFailDailyAdmin(admin.ModelAdmin):
+    list_display = ["date", "validator_name", "resolved"]
+    list_filter = ["date"]
+    search_fields = ["validator_name"]
+
+
+admin.site.register(ConsistencyFailDaily, ConsistencyFailDailyAdmin)
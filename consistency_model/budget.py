@@ -0,0 +1,81 @@
+"""
+Time budget and row rate of a scan (see gen_consistency_errors @budget).
+"""
+
+import threading
+import time
+from typing import Generator, Iterable, List, Optional
+
+# checkers without chunk_size are scanned by chunks of that size under a budget
+PACE_CHUNK_SIZE = 1000
+
+
+class ScanBudget:
+    """
+    limits a scan by time and by rate of checked rows.
+    The scan is paced and stopped between chunks of objects.
+
+    @max_seconds - the scan stops when that many seconds passed since the budget was created
+    @max_rows_per_second - the scan sleeps between chunks to stay under that rate
+    @stop_event - the scan stops when the event is set (e.g. by a signal handler)
+    """
+
+    def __init__(
+        self,
+        max_seconds: Optional[float] = None,
+        max_rows_per_second: Optional[float] = None,
+        stop_event: Optional[threading.Event] = None,
+    ) -> None:
+        self.max_seconds = max_seconds
+        self.max_rows_per_second = max_rows_per_second
+        self.stop_event = stop_event
+        self.started = time.monotonic()
+        self.rows = 0
+        self.exhausted = False
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def check(self) -> bool:
+        """
+        False when the time is over or the scan is stopped (the scan must stop)
+        """
+        if self.exhausted:
+            return False
+        if self.max_seconds is not None and self.elapsed() >= self.max_seconds:
+            self.exhausted = True
+        elif self.stop_event is not None and self.stop_event.is_set():
+            self.exhausted = True
+        return not self.exhausted
+
+    def pace(self, rows: int) -> bool:
+        """
+        accounts @rows checked rows and sleeps if the rate is above max_rows_per_second.
+
+        returns False when the time is over
+        """
+        self.rows += rows
+        if self.max_rows_per_second:
+            delay = self.rows / self.max_rows_per_second - self.elapsed()
+            if self.max_seconds is not None:
+                delay = min(delay, self.max_seconds - self.elapsed())
+            if delay > 0:
+                if self.stop_event is not None:
+                    self.stop_event.wait(delay)
+                else:
+                    time.sleep(delay)
+        return self.check()
+
+    def gen_chunks(self, chunks: Iterable[List]) -> Generator[List, None, None]:
+        """
+        generates @chunks until the time is over.
+        The next chunk is not loaded when the time is over.
+        """
+        chunks = iter(chunks)
+        while self.check():
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            yield chunk
+            self.pace(len(chunk))
@@ -0,0 +1,263 @@
+"""
+Cache of passed checks, the unchanged objects are not validated again
+(see gen_consistency_errors @cache).
+"""
+
+import hashlib
+import sqlite3
+import time
+from collections import defaultdict
+from functools import wraps
+from typing import Any, Dict, Generator, Iterable, List, Optional, Set, Tuple
+
+from .settings import RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL
+from .tools import _ERRORS
+
+# objects are looked up in the cache by batches of that size
+CACHE_BATCH_SIZE = 1000
+# max number of parameters of one sqlite query
+SQLITE_BATCH_SIZE = 500
+
+
+def _get_code_signature(code) -> str:
+    consts = [
+        _get_code_signature(const) if hasattr(const, "co_code") else repr(const)
+        for const in code.co_consts
+    ]
+    return "{}|{}|{}".format(code.co_code.hex(), consts, code.co_names)
+
+
+def get_validator_version(func) -> str:
+    """
+    hash of the code and the declared fields of the validator,
+    so the cached results are not used when the validator is changed
+    """
+    data = [func.__qualname__, repr(getattr(func, "consistency_fields", None))]
+    code = getattr(func, "__code__", None)
+    if code is not None:
+        data.append(_get_code_signature(code))
+    return hashlib.sha1("\n".join(data).encode()).hexdigest()[:16]
+
+
+def is_cacheable(func) -> bool:
+    """
+    the result of the validator depends on the declared fields only
+    """
+    return (
+        getattr(func, "consistency_fields", None) is not None
+        and not getattr(func, "consistency_select_related", ())
+        and not getattr(func, "consistency_prefetch_related", ())
+    )
+
+
+class ResultCache:
+    """
+    passed checks (validator, object_id, fingerprint of the fields) in a local sqlite file.
+
+    @ttl - seconds a result is used after the last use
+    @max_entries - the least recently used results above that number are removed
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = RESULT_CACHE_TTL,
+        max_entries: Optional[int] = RESULT_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "validator TEXT NOT NULL, object_id TEXT NOT NULL, "
+            "fingerprint BLOB NOT NULL, used_on REAL NOT NULL, "
+            "PRIMARY KEY (validator, object_id)) WITHOUT ROWID"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS results_used_on ON results (used_on)"
+        )
+
+    def get_unchanged(self, validator: str, fingerprints: Dict[Any, bytes]) -> Set[Any]:
+        """
+        pks of @fingerprints (pk => fingerprint) that passed @validator with the same
+        fingerprint. Their results are marked as used.
+        """
+        object_ids = {str(pk): pk for pk in fingerprints}
+        min_used_on = 0.0 if self.ttl is None else time.time() - self.ttl
+        unchanged = set()
+        keys = list(object_ids)
+        for i in range(0, len(keys), SQLITE_BATCH_SIZE):
+            batch = keys[i : i + SQLITE_BATCH_SIZE]
+            rows = self.connection.execute(
+                "SELECT object_id, fingerprint FROM results "
+                "WHERE validator = ? AND used_on >= ? AND object_id IN ({})".format(
+                    ",".join("?" * len(batch))
+                ),
+                [validator, min_used_on] + batch,
+            )
+            for object_id, fingerprint in rows:
+                pk = object_ids[object_id]
+                if fingerprints[pk] == fingerprint:
+                    unchanged.add(pk)
+
+        now = time.time()
+        self.connection.executemany(
+            "UPDATE results SET used_on = ? WHERE validator = ? AND object_id = ?",
+            [(now, validator, str(pk)) for pk in unchanged],
+        )
+        return unchanged
+
+    def add(self, validator: str, results: Iterable[Tuple[Any, bytes]]) -> None:
+        """
+        saves passed checks: (pk, fingerprint)
+        """
+        now = time.time()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+            [(validator, str(pk), fingerprint, now) for pk, fingerprint in results],
+        )
+        self.connection.commit()
+
+    def evict(self) -> None:
+        """
+        removes expired and least recently used results
+        """
+        if self.ttl is not None:
+            self.connection.execute(
+                "DELETE FROM results WHERE used_on < ?", [time.time() - self.ttl]
+            )
+        if self.max_entries is not None:
+            (count,) = self.connection.execute(
+                "SELECT COUNT(*) FROM results"
+            ).fetchone()
+            if count > self.max_entries:
+                self.connection.execute(
+                    "DELETE FROM results WHERE (validator, object_id) IN ("
+                    "SELECT validator, object_id FROM results ORDER BY used_on LIMIT ?)",
+                    [count - self.max_entries],
+                )
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.evict()
+        self.connection.close()
+
+
+class _CachedValidator:
+    def __init__(self, cache: ResultCache, func, validator_name: str) -> None:
+        self.cache = cache
+        self.key = "{}:{}".format(validator_name, get_validator_version(func))
+        self.fields = func.consistency_fields
+        self.attnames: Optional[List[str]] = None
+        # pk => fingerprint of the objects of the current batch
+        self.fingerprints: Dict[Any, bytes] = {}
+        self.unchanged: Set[Any] = set()
+        self.passed: List[Tuple[Any, bytes]] = []
+        self.hits = 0
+
+    def get_fingerprint(self, obj) -> bytes:
+        if self.attnames is None:
+            meta = obj._meta
+            self.attnames = [meta.get_field(name).attname for name in self.fields]
+        values = repr(tuple(getattr(obj, attname) for attname in self.attnames))
+        return hashlib.blake2b(values.encode(), digest_size=8).digest()
+
+    def prepare(self, objects: List[Any]) -> None:
+        self.fingerprints = {obj.pk: self.get_fingerprint(obj) for obj in objects}
+        self.unchanged = self.cache.get_unchanged(self.key, self.fingerprints)
+
+    def wrap(self, func):
+        @wraps(func)
+        def _(obj):
+            pk = obj.pk
+            if pk in self.unchanged:
+                self.hits += 1
+                # the check is skipped
+                return True
+
+            errors = _ERRORS.get()
+            errors_count = len(errors) if errors is not None else 0
+            skip = func(obj)
+            if not skip and (errors is None or len(errors) == errors_count):
+                self.passed.append((pk, self.fingerprints[pk]))
+            return skip
+
+        return _
+
+    def flush(self) -> None:
+        if self.passed:
+            self.cache.add(self.key, self.passed)
+            self.passed = []
+
+
+class ValidationCache:
+    """
+    skips validators with declared fields (see is_cacheable)
+    for the objects that passed them before and whose fields are not changed.
+    Only passed checks are cached, failed objects are validated every time.
+
+    @hits - validator name => number of skipped checks
+    """
+
+    def __init__(self, cache: ResultCache, batch_size: int = CACHE_BATCH_SIZE) -> None:
+        self.cache = cache
+        self.batch_size = batch_size
+        self.hits: Dict[str, int] = defaultdict(int)
+
+    def session(self) -> "ValidationCacheSession":
+        return ValidationCacheSession(self)
+
+    def close(self) -> None:
+        self.cache.close()
+
+
+class ValidationCacheSession:
+    """
+    the cache of one model: the objects are looked up by batches
+    """
+
+    def __init__(self, cache: ValidationCache) -> None:
+        self.cache = cache
+        self.validators: Dict[str, _CachedValidator] = {}
+
+    def wrap_validator(self, func, validator_name: str):
+        if not is_cacheable(func):
+            return func
+        validator = _CachedValidator(self.cache.cache, func, validator_name)
+        self.validators[validator_name] = validator
+        return validator.wrap(func)
+
+    def gen_objects(self, objects) -> Generator:
+        if not self.validators:
+            yield from objects
+            return
+
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.cache.batch_size:
+                yield from self._gen_batch(batch)
+                batch = []
+        if batch:
+            yield from self._gen_batch(batch)
+
+    def _gen_batch(self, batch) -> Generator:
+        # the results of the previous batch are saved
+        self.flush()
+        for validator in self.validators.values():
+            validator.prepare(batch)
+        yield from batch
+
+    def flush(self, stats=None) -> None:
+        """
+        saves the passed checks, the skipped checks are added to @stats as "cached.*"
+        """
+        for validator_name, validator in self.validators.items():
+            validator.flush()
+            if validator.hits:
+                self.cache.hits[validator_name] += validator.hits
+                if stats is not None:
+                    stats_k = "cached." + validator_name
+                    stats[stats_k] = stats.get(stats_k, 0) + validator.hits
+                validator.hits = 0
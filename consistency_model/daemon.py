@@ -0,0 +1,102 @@
+"""
+Long-running monitoring (consistency_model_monitoring --daemon):
+every model is checked on the interval of its checker in one warm process.
+"""
+
+import heapq
+import logging
+import random
+import signal
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from django.db import close_old_connections
+
+from .settings import DAEMON_INTERVAL, DAEMON_JITTER
+from .tools import ValidationPlan, get_register_consistency, monitoring_iteration
+
+logger = logging.getLogger(__name__)
+
+
+class MonitoringDaemon:
+    """
+    runs monitoring_iteration for every model of @validators every checker.interval
+    seconds (CONSISTENCY_DAEMON_INTERVAL for checkers without interval).
+    All of the models are checked once when the daemon starts.
+
+    @jitter - share of the interval the next run is moved by randomly,
+    so models with the same interval are not checked at the same moment
+    (CONSISTENCY_DAEMON_JITTER by default)
+    @kwargs - arguments of monitoring_iteration
+    """
+
+    def __init__(
+        self,
+        validators=None,
+        exclude_validators=None,
+        jitter: Optional[float] = None,
+        **kwargs
+    ) -> None:
+        self.plan = ValidationPlan(validators, exclude_validators=exclude_validators)
+        self.jitter = DAEMON_JITTER if jitter is None else jitter
+        self.kwargs = kwargs
+        self.stopped = threading.Event()
+        # (time of the next run, index of the model in plan.models)
+        self.schedule: List[Tuple[float, int]] = []
+        now = time.monotonic()
+        for i in range(len(self.plan.models)):
+            heapq.heappush(self.schedule, (now, i))
+
+    def get_interval(self, model_plan) -> float:
+        interval = get_register_consistency(model_plan.cls).interval
+        return DAEMON_INTERVAL if interval is None else interval
+
+    def get_next_run(self, model_plan, now: float) -> float:
+        interval = self.get_interval(model_plan)
+        return now + interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def run_model(self, model_plan) -> None:
+        # the connections are closed between the runs the same way
+        # as between requests, so the daemon survives DB restarts
+        close_old_connections()
+        kwargs = dict(self.kwargs)
+        if not kwargs.get("workers"):
+            # a stopped daemon doesn't wait for the end of the scan
+            kwargs["stop_event"] = self.stopped
+        try:
+            monitoring_iteration([(model_plan.name, model_plan.funcs)], **kwargs)
+        except Exception:
+            logger.exception("monitoring of %s.%s failed", *model_plan.name)
+        finally:
+            close_old_connections()
+
+    def run(self) -> None:
+        """
+        runs the models when they are due until stop() is called.
+        The scan of the model that is checked when the daemon is stopped
+        stops after the current chunk of objects (with workers the model is finished first).
+        """
+        while self.schedule and not self.stopped.is_set():
+            next_run, i = self.schedule[0]
+            delay = next_run - time.monotonic()
+            if delay > 0:
+                self.stopped.wait(delay)
+                continue
+
+            heapq.heappop(self.schedule)
+            model_plan = self.plan.models[i]
+            self.run_model(model_plan)
+            heapq.heappush(
+                self.schedule, (self.get_next_run(model_plan, time.monotonic()), i)
+            )
+
+    def stop(self, *args) -> None:
+        self.stopped.set()
+
+    def handle_signals(self) -> None:
+        """
+        SIGTERM and SIGINT stop the daemon gracefully
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
@@ -1,7 +1,57 @@
+import copy
+import csv
+import io
+import json
+from collections import defaultdict
+
 from django.core.management.base import BaseCommand, CommandError
 from django.apps import apps
 
-from consistency_model import gen_consistency_errors, gen_validators
+from consistency_model import (
+    ValidationTimings,
+    ValidationQueries,
+    ValidationProfile,
+    ScanCursors,
+    ValidationPlan,
+    gen_consistency_errors,
+    gen_validators,
+)
+from consistency_model.cache import ResultCache, ValidationCache
+from consistency_model.parallel import gen_consistency_errors_in_workers
+from consistency_model.sampling import get_failure_estimates
+from consistency_model.tools import get_register_consistency
+
+# how many errors are written to the output at once
+OUTPUT_BUFFER_SIZE = 1000
+
+CSV_HEADER = ("validator", "model", "pk", "error", "message")
+
+
+def gen_error_records(errors):
+    """
+    splits "app.Model.func.error_name" validator names of @errors into
+    (validator, model, pk, error name, message) records
+    """
+    for v_name, obj, message in errors:
+        app, model, func, *error_name = v_name.split(".", 3)
+        yield (
+            "{}.{}.{}".format(app, model, func),
+            "{}.{}".format(app, model),
+            obj.pk,
+            error_name[0] if error_name else "",
+            str(message),
+        )
+
+
+def gen_recorded_failures(errors, stats, failed_objects):
+    """
+    records pks of failed objects of the sampled models (see get_failure_estimates)
+    """
+    for v_name, obj, message in errors:
+        app, model, func = v_name.split(".")[:3]
+        if "sample.{}.{}".format(app, model) in stats:
+            failed_objects["{}.{}.{}".format(app, model, func)].add(obj.pk)
+        yield v_name, obj, message
 
 
 class Command(BaseCommand):
@@ -11,6 +61,17 @@ class Command(BaseCommand):
         parser.add_argument("--filter", type=str, nargs="*")
         parser.add_argument("--exclude", type=str, nargs="*")
         parser.add_argument("--object", type=str, nargs="?")
+        parser.add_argument("--workers", type=int)
+        parser.add_argument("--timings", action="store_true")
+        parser.add_argument("--queries", action="store_true")
+        parser.add_argument("--profile", type=str, metavar="PATH")
+        parser.add_argument("--profile-models", action="store_true")
+        parser.add_argument(
+            "--format", choices=("text", "jsonl", "csv"), default="text"
+        )
+        parser.add_argument("--resume", action="store_true")
+        parser.add_argument("--sample", type=int, metavar="SIZE")
+        parser.add_argument("--cache", type=str, metavar="PATH")
 
     def handle(self, *args, **options):
         validators = gen_validators(options["filter"]) if options["filter"] else None
@@ -30,16 +91,90 @@ class Command(BaseCommand):
         else:
             objects = None
 
+        timings = ValidationTimings() if options.get("timings") else None
+        queries = ValidationQueries() if options.get("queries") else None
+        if (timings is not None or queries is not None) and options.get("workers"):
+            raise CommandError("--timings and --queries can't be used with --workers")
+
+        profile = None
+        if options.get("profile"):
+            if options.get("workers"):
+                raise CommandError("--profile can't be used with --workers")
+            profile = ValidationProfile(per_model=options.get("profile_models"))
+        elif options.get("profile_models"):
+            raise CommandError("--profile-models requires --profile")
+
+        cursors = None
+        if options.get("resume"):
+            if options.get("workers") or objects is not None:
+                raise CommandError("--resume can't be used with --workers or --object")
+            # the errors printed before a cursor are flushed before the cursor is saved
+            cursors = ScanCursors("check", before_save=self.flush_output)
+
+        checkers = None
+        if options.get("sample"):
+            if options.get("workers") or options.get("resume") or objects is not None:
+                raise CommandError(
+                    "--sample can't be used with --workers, --resume or --object"
+                )
+            validators = ValidationPlan(
+                validators, exclude_validators=exclude_validators
+            )
+            exclude_validators = None
+            checkers = {}
+            for model_plan in validators.models:
+                checker = copy.copy(get_register_consistency(model_plan.cls))
+                checker.sample_size = options["sample"]
+                checkers[model_plan.cls] = checker
+
+        cache = None
+        if options.get("cache"):
+            if options.get("workers"):
+                raise CommandError("--cache can't be used with --workers")
+            cache = ValidationCache(ResultCache(options["cache"]))
+
+        self.output_buffer = None
         stats = {}
-        for v_name, obj, message in gen_consistency_errors(
-            validators,
-            exclude_validators=exclude_validators,
-            objects=objects,
-            stats=stats,
-        ):
-            print("{} [{}] {}".format(v_name, obj.pk, message), file=self.stderr)
+        if options.get("workers") and objects is None:
+            errors = gen_consistency_errors_in_workers(
+                options["workers"],
+                validators,
+                exclude_validators=exclude_validators,
+                stats=stats,
+            )
+        else:
+            errors = gen_consistency_errors(
+                validators,
+                exclude_validators=exclude_validators,
+                objects=objects,
+                stats=stats,
+                timings=timings,
+                queries=queries,
+                profile=profile,
+                cursors=cursors,
+                checkers=checkers,
+                cache=cache,
+            )
+
+        # validator "app.Model.func" => pks of failed objects of sampled models
+        failed_objects = defaultdict(set)
+        errors = gen_recorded_failures(errors, stats, failed_objects)
+
+        output_format = options.get("format") or "text"
+        try:
+            if profile is not None:
+                with profile.enabled():
+                    self.print_errors(errors, output_format)
+            else:
+                self.print_errors(errors, output_format)
+        finally:
+            if cache is not None:
+                cache.close()
 
-        print("\nStats:", file=self.stdout)
+        # the errors are in stdout with structured formats, so reports go to stderr
+        report = self.stdout if output_format == "text" else self.stderr
+
+        print("\nStats:", file=report)
         print(
             "\n".join(
                 [
@@ -47,5 +182,66 @@ class Command(BaseCommand):
                     for a in sorted(stats.items(), key=lambda a: a[1], reverse=True)
                 ]
             ),
-            file=self.stdout,
+            file=report,
         )
+
+        estimates = get_failure_estimates(stats, failed_objects)
+        if estimates:
+            print("\nEstimates:", file=report)
+            print(
+                "\n".join(
+                    "{name}: failures={failures}/{total} rate={rate:.2%} "
+                    "(95% CI {low:.2%}-{high:.2%})".format(**row)
+                    for row in estimates
+                ),
+                file=report,
+            )
+
+        if timings is not None:
+            print("\nTimings:", file=report)
+            print(timings.format_report(), file=report)
+
+        if queries is not None:
+            print("\nQueries:", file=report)
+            print(queries.format_report(), file=report)
+
+        if profile is not None:
+            print("\nProfile:", file=report)
+            print("\n".join(profile.dump(options["profile"])), file=report)
+
+    def print_errors(self, errors, output_format="text"):
+        if output_format != "text":
+            self.write_records(errors, output_format)
+            return
+        for v_name, obj, message in errors:
+            print("{} [{}] {}".format(v_name, obj.pk, message), file=self.stderr)
+
+    def write_records(self, errors, output_format):
+        buffer = self.output_buffer = io.StringIO()
+        if output_format == "csv":
+            writer = csv.writer(buffer, lineterminator="\n")
+            writer.writerow(CSV_HEADER)
+            write = writer.writerow
+        else:
+
+            def write(record):
+                buffer.write(json.dumps(dict(zip(CSV_HEADER, record)), default=str))
+                buffer.write("\n")
+
+        size = 0
+        for record in gen_error_records(errors):
+            write(record)
+            size += 1
+            if size >= OUTPUT_BUFFER_SIZE:
+                self.flush_output()
+                size = 0
+        self.flush_output()
+
+    def flush_output(self):
+        buffer = self.output_buffer
+        if buffer is None:
+            return
+        self.stdout.write(buffer.getvalue(), ending="")
+        self.stdout.flush()
+        buffer.seek(0)
+        buffer.truncate()
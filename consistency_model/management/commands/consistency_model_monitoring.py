@@ -11,12 +11,16 @@ except ImportError:
         return _
 
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 from consistency_model import (
+    RollingScan,
+    ValidationPlan,
+    ValidationProfile,
     gen_validators,
     monitoring_iteration,
 )
+from consistency_model.daemon import MonitoringDaemon
 from consistency_model.settings import PID_MONITORING_FILENAME, PID_MONITORING_FOLDER
 
 
@@ -26,6 +30,14 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("--filter", type=str, nargs="*")
         parser.add_argument("--exclude", type=str, nargs="*")
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--workers", type=int)
+        parser.add_argument("--profile", type=str, metavar="PATH")
+        parser.add_argument("--profile-models", action="store_true")
+        parser.add_argument("--max-seconds", type=float)
+        parser.add_argument("--max-rows-per-second", type=float)
+        parser.add_argument("--resume", action="store_true")
+        parser.add_argument("--daemon", action="store_true")
 
     @pidfile(
         piddir=(
@@ -39,4 +51,70 @@ class Command(BaseCommand):
         exclude_validators = (
             gen_validators(options["exclude"]) if options["exclude"] else None
         )
-        monitoring_iteration(validators, exclude_validators)
+
+        profile = None
+        if options["profile"]:
+            if options["workers"]:
+                raise CommandError("--profile can't be used with --workers")
+            profile = ValidationProfile(per_model=options["profile_models"])
+        elif options["profile_models"]:
+            raise CommandError("--profile-models requires --profile")
+
+        if options["workers"] and (
+            options["max_seconds"] is not None
+            or options["max_rows_per_second"] is not None
+        ):
+            raise CommandError(
+                "--max-seconds and --max-rows-per-second can't be used with --workers"
+            )
+        if options["workers"] and options["resume"]:
+            raise CommandError("--resume can't be used with --workers")
+        if options["workers"]:
+            validators = ValidationPlan(
+                validators, exclude_validators=exclude_validators
+            )
+            exclude_validators = None
+            rolling_labels = validators.get_rolling_labels()
+            if rolling_labels:
+                raise CommandError(
+                    "--workers can't be used with rolling_buckets ({})".format(
+                        ", ".join(rolling_labels)
+                    )
+                )
+
+        if options["daemon"]:
+            if profile is not None:
+                raise CommandError("--profile can't be used with --daemon")
+            daemon = MonitoringDaemon(
+                validators,
+                exclude_validators,
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                max_seconds=options["max_seconds"],
+                max_rows_per_second=options["max_rows_per_second"],
+                resume=options["resume"],
+            )
+            daemon.handle_signals()
+            daemon.run()
+            return
+
+        rolling = RollingScan()
+        kwargs = dict(
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            max_seconds=options["max_seconds"],
+            max_rows_per_second=options["max_rows_per_second"],
+            resume=options["resume"],
+            rolling=rolling,
+        )
+        if profile is None:
+            monitoring_iteration(validators, exclude_validators, **kwargs)
+        else:
+            with profile.enabled():
+                monitoring_iteration(
+                    validators, exclude_validators, profile=profile, **kwargs
+                )
+            print("\n".join(profile.dump(options["profile"])), file=self.stdout)
+
+        if rolling.plans:
+            print(rolling.format_plans(), file=self.stdout)
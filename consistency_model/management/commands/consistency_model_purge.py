@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from consistency_model.budget import ScanBudget
+from consistency_model.retention import purge_resolved_fails
+from consistency_model.settings import FAIL_RETENTION_DAYS
+
+
+class Command(BaseCommand):
+    help = "Removes ConsistencyFail objects resolved more than N days ago"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=float)
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--archive", type=str, metavar="PATH")
+        parser.add_argument("--rollup", action="store_true")
+        parser.add_argument("--max-seconds", type=float)
+        parser.add_argument("--max-rows-per-second", type=float)
+
+    def handle(self, *args, **options):
+        days = options["days"]
+        if days is None:
+            days = FAIL_RETENTION_DAYS
+        if days is None:
+            raise CommandError("--days or CONSISTENCY_FAIL_RETENTION_DAYS is required")
+
+        budget = None
+        if (
+            options["max_seconds"] is not None
+            or options["max_rows_per_second"] is not None
+        ):
+            budget = ScanBudget(options["max_seconds"], options["max_rows_per_second"])
+
+        kwargs = dict(
+            days=days,
+            batch_size=options["batch_size"],
+            rollup=options["rollup"],
+            budget=budget,
+        )
+        if options["archive"]:
+            with open(options["archive"], "a") as archive:
+                deleted = purge_resolved_fails(archive=archive, **kwargs)
+        else:
+            deleted = purge_resolved_fails(**kwargs)
+
+        print("Deleted {} resolved fails".format(deleted), file=self.stdout)
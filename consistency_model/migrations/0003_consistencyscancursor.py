@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consistency_model", "0002_consistencycheckpoint"),
+        ("contenttypes", "0002_remove_content_type_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ConsistencyScanCursor",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("updated_on", models.DateTimeField(auto_now=True)),
+                ("name", models.CharField(max_length=50)),
+                ("validators_hash", models.CharField(max_length=40)),
+                ("object_id", models.CharField(max_length=255)),
+                (
+                    "last_object_id",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                ("stats", models.TextField(default="{}")),
+                ("bucket", models.PositiveIntegerField(blank=True, null=True)),
+                ("buckets", models.PositiveIntegerField(blank=True, null=True)),
+                ("range_first", models.BigIntegerField(blank=True, null=True)),
+                ("bucket_width", models.BigIntegerField(blank=True, null=True)),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("name", "content_type", "validators_hash")},
+            },
+        ),
+    ]
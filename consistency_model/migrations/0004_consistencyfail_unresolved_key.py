@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:59
+
+from django.db import migrations, models
+
+
+def resolve_duplicate_fails(apps, schema_editor):
+    """
+    only the newest unresolved fail of the object and the validator stays unresolved
+    """
+    ConsistencyFail = apps.get_model("consistency_model", "ConsistencyFail")
+    duplicates = (
+        ConsistencyFail.objects.filter(resolved=False)
+        .values("content_type_id", "object_id", "validator_name")
+        .annotate(count=models.Count("id"), last_id=models.Max("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        ConsistencyFail.objects.filter(
+            resolved=False,
+            content_type_id=duplicate["content_type_id"],
+            object_id=duplicate["object_id"],
+            validator_name=duplicate["validator_name"],
+            id__lt=duplicate["last_id"],
+        ).update(resolved=True, resolved_on=models.F("updated_on"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consistency_model", "0003_consistencyscancursor"),
+        ("contenttypes", "0002_remove_content_type_name"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="consistencyfail",
+            name="consistency_fail_vor",
+        ),
+        migrations.AlterField(
+            model_name="consistencyfail",
+            name="object_id",
+            field=models.CharField(max_length=255),
+        ),
+        migrations.RunPython(resolve_duplicate_fails, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="consistencyfail",
+            index=models.Index(
+                condition=models.Q(("resolved", False)),
+                fields=["content_type", "validator_name"],
+                name="consistency_fail_open",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="consistencyfail",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("resolved", False)),
+                fields=("content_type", "object_id", "validator_name"),
+                name="consistency_fail_unresolved",
+            ),
+        ),
+    ]
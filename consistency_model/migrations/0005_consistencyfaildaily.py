@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consistency_model", "0004_consistencyfail_unresolved_key"),
+        ("contenttypes", "0002_remove_content_type_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ConsistencyFailDaily",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("validator_name", models.CharField(max_length=500)),
+                ("resolved", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="consistencyfail",
+            index=models.Index(
+                condition=models.Q(("resolved", True)),
+                fields=["resolved_on"],
+                name="consistency_fail_resolved_on",
+            ),
+        ),
+        migrations.AddField(
+            model_name="consistencyfaildaily",
+            name="content_type",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to="contenttypes.contenttype",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="consistencyfaildaily",
+            unique_together={("date", "content_type", "validator_name")},
+        ),
+    ]
@@ -1,3 +1,6 @@
+import json
+from typing import Dict
+
 from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
@@ -14,19 +17,46 @@ class ConsistencyFail(models.Model):
     resolved_on = models.DateTimeField(null=True)
     validator_name = models.CharField(max_length=500)
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
-    object_id = models.PositiveIntegerField()
+    # a string, so models with UUID, bigint or string pks can be checked
+    object_id = models.CharField(max_length=255)
     content_object = GenericForeignKey("content_type", "object_id")
     message = models.TextField()
     resolved = models.BooleanField(default=False, db_index=True)
 
     class Meta:
+        constraints = [
+            # one unresolved fail per object and validator,
+            # monitoring upserts into it (see _save_consistency_fails)
+            # with get_unresolved_condition_sql as the condition of the conflict target.
+            # The backends without partial indexes (MySQL) skip the constraint
+            models.UniqueConstraint(
+                fields=["content_type", "object_id", "validator_name"],
+                condition=models.Q(resolved=False),
+                name="consistency_fail_unresolved",
+            )
+        ]
         indexes = [
+            # unresolved fails of the model and the validators rechecked by monitoring
             models.Index(
-                fields=["validator_name", "object_id", "resolved_on"],
-                name="consistency_fail_vor",
-            )
+                fields=["content_type", "validator_name"],
+                condition=models.Q(resolved=False),
+                name="consistency_fail_open",
+            ),
+            # resolved fails removed by consistency_model_purge
+            models.Index(
+                fields=["resolved_on"],
+                condition=models.Q(resolved=True),
+                name="consistency_fail_resolved_on",
+            ),
         ]
 
+    @classmethod
+    def get_unresolved_condition_sql(cls, quote_name) -> str:
+        """
+        SQL condition of "consistency_fail_unresolved" index: resolved = false
+        """
+        return "{} = false".format(quote_name(cls._meta.get_field("resolved").column))
+
     def resolve(self):
         assert not self.resolved
         self.resolved = True
@@ -46,3 +76,77 @@ class ConsistencyFail(models.Model):
         return f"{self.validator_name}: {self.message}" + (
             " - RESOLVED" if self.resolved else ""
         )
+
+
+class ConsistencyFailDaily(models.Model):
+    """
+    Number of resolved fails per day, model and validator
+    kept by consistency_model_purge --rollup after the fails are removed
+    """
+
+    date = models.DateField()
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    validator_name = models.CharField(max_length=500)
+    resolved = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = [("date", "content_type", "validator_name")]
+
+    def __str__(self) -> str:
+        return f"{self.date} {self.validator_name}: {self.resolved}"
+
+
+class ConsistencyCheckpoint(models.Model):
+    """
+    The last object checked by incremental consistency_model_monitoring
+    for the model and the set of validators
+    """
+
+    updated_on = models.DateTimeField(auto_now=True)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    validators_hash = models.CharField(max_length=40)
+    value = models.TextField()
+    object_id = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = [("content_type", "validators_hash")]
+
+    def __str__(self) -> str:
+        return f"{self.content_type}: {self.value} [{self.object_id}]"
+
+
+class ConsistencyScanCursor(models.Model):
+    """
+    Progress of a resumable scan (consistency_model_check or consistency_model_monitoring
+    with --resume) for the model and the set of validators:
+    the last checked object and the stats collected so far.
+
+    The cursors of the rolling scans (see RollingScan) keep the current bucket
+    of the pk range instead, object_id is the last checked object of the bucket
+    """
+
+    updated_on = models.DateTimeField(auto_now=True)
+    name = models.CharField(max_length=50)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    validators_hash = models.CharField(max_length=40)
+    # the last checked object
+    object_id = models.CharField(max_length=255)
+    # the last object of the scan window (checker.limit), empty if the scan has no end
+    last_object_id = models.CharField(max_length=255, blank=True, default="")
+    # JSON of the stats collected so far
+    stats = models.TextField(default="{}")
+    # rolling scan: the pk range from range_first is split into buckets
+    # of bucket_width pks, bucket is the current one (from 0)
+    bucket = models.PositiveIntegerField(null=True, blank=True)
+    buckets = models.PositiveIntegerField(null=True, blank=True)
+    range_first = models.BigIntegerField(null=True, blank=True)
+    bucket_width = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        unique_together = [("name", "content_type", "validators_hash")]
+
+    def get_stats(self) -> Dict[str, int]:
+        return json.loads(self.stats)
+
+    def __str__(self) -> str:
+        return f"{self.name} {self.content_type}: [{self.object_id}]"
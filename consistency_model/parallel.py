@@ -0,0 +1,150 @@
+"""
+Sharded execution of gen_consistency_errors in a pool of processes.
+"""
+
+import multiprocessing
+from typing import Any, Generator, List, Tuple
+
+import django
+from django.apps import apps
+from django.db import connections
+
+from .tools import (
+    _get_validators,
+    gen_consistency_errors,
+    gen_validators_by_func,
+    get_register_consistency,
+    is_query_validator,
+)
+
+# every worker gets about that many shards of each model
+SHARDS_PER_WORKER = 4
+
+
+def _init_worker():
+    # with "spawn" start method the worker starts with not configured django
+    if not apps.ready:
+        django.setup()
+
+    # connections inherited by "fork" can't be shared with the parent process
+    for conn in connections.all():
+        conn.close()
+
+
+def _check_shard(task):
+    """
+    checks one shard in a worker process.
+
+    returns (model label, errors of python validators,
+    (position of the validator, error) of query validators, stats)
+    """
+    model_label, func_names, shard, collect_stats = task
+
+    cls_model = apps.get_model(model_label)
+    checker = get_register_consistency(cls_model).get_shard(shard)
+    stats = {} if collect_stats else None
+    validators = list(gen_validators_by_func(func_names))
+    # validator name => position of the query validator in @func_names
+    query_names = {
+        "{}.{}".format(model_label, func.__name__): i
+        for i, func in enumerate(
+            func for _, list_funcs in validators for func in list_funcs
+        )
+        if is_query_validator(func)
+    }
+
+    errors = []
+    query_errors = []
+    for validator_name, obj, message in gen_consistency_errors(
+        validators,
+        stats=stats,
+        checkers={cls_model: checker},
+    ):
+        error = (validator_name, obj, str(message))
+        if validator_name in query_names:
+            query_errors.append((query_names[validator_name], error))
+        else:
+            errors.append(error)
+    return model_label, errors, query_errors, stats
+
+
+def gen_consistency_errors_in_workers(
+    workers: int,
+    validators=None,
+    create_validators=None,
+    exclude_validators=None,
+    create_exclude_validators=None,
+    stats=None,
+    checkpoints=None,
+) -> Generator[Tuple[str, Any, Any], None, None]:
+    """
+    the same as gen_consistency_errors, but the objects of each model are split
+    into shards (ConsistencyChecker.get_shards) that are checked by @workers processes.
+
+    Every worker uses its own DB connection. Errors and stats are merged
+    in the current process, the messages of the errors are strings.
+    With @workers=1 the shards are checked in the current process.
+
+    Models with incremental monitoring (@checkpoints) are checked in the current process.
+    """
+    validators = _get_validators(
+        validators, create_validators, exclude_validators, create_exclude_validators
+    )
+
+    tasks = []
+    for (app_label, model), list_funcs in validators:
+        cls_model = apps.get_model(app_label=app_label, model_name=model)
+        checker = get_register_consistency(cls_model)
+
+        if checkpoints is not None and checker.incremental_field is not None:
+            yield from gen_consistency_errors(
+                [((app_label, model), list_funcs)],
+                stats=stats,
+                checkpoints=checkpoints,
+            )
+            continue
+
+        func_names = [
+            "{}.{}.{}".format(app_label, model, func.__name__) for func in list_funcs
+        ]
+        for shard in checker.get_shards(workers * SHARDS_PER_WORKER):
+            tasks.append((cls_model._meta.label, func_names, shard, stats is not None))
+
+    if not tasks:
+        return
+
+    if workers <= 1:
+        yield from _merge_results(map(_check_shard, tasks), stats)
+        return
+
+    # forked workers must not reuse connections of the current process
+    connections.close_all()
+
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        yield from _merge_results(pool.imap(_check_shard, tasks), stats)
+
+
+def _merge_results(results, stats) -> Generator[Tuple[str, Any, Any], None, None]:
+    """
+    yields the errors of the shards in the same order as gen_consistency_errors does:
+    the errors of python validators of all of the shards of the model,
+    then the errors of its query validators grouped by validator
+    """
+    model_label = None
+    query_errors: List[Tuple[int, Tuple[str, Any, Any]]] = []
+    for shard_model_label, errors, shard_query_errors, shard_stats in results:
+        if shard_model_label != model_label:
+            yield from _sort_query_errors(query_errors)
+            model_label = shard_model_label
+            query_errors = []
+        if shard_stats:
+            for k, v in shard_stats.items():
+                stats[k] = stats.get(k, 0) + v
+        yield from errors
+        query_errors.extend(shard_query_errors)
+    yield from _sort_query_errors(query_errors)
+
+
+def _sort_query_errors(query_errors) -> List[Tuple[str, Any, Any]]:
+    # stable sort keeps the order of the shards for every validator
+    return [error for _, error in sorted(query_errors, key=lambda e: e[0])]
@@ -0,0 +1,84 @@
+"""
+cProfile output of the validation engine (see gen_consistency_errors @profile).
+"""
+
+import cProfile
+import pstats
+from contextlib import contextmanager
+from typing import Dict, Generator, List
+
+
+class ValidationProfile:
+    """
+    collects cProfile data of the validation.
+    Every validator call is a separate function in the profile,
+    so the result can be loaded into pstats/snakeviz.
+
+    @per_model - every model gets its own profile (time spent to load and check
+    objects of the model), everything else is collected by the main profile
+    """
+
+    def __init__(self, per_model: bool = False) -> None:
+        self.per_model = per_model
+        self.profile = cProfile.Profile()
+        self.models: Dict[str, cProfile.Profile] = {}
+        self._enabled = False
+
+    @contextmanager
+    def enabled(self):
+        self._enabled = True
+        self.profile.enable()
+        try:
+            yield self
+        finally:
+            self.profile.disable()
+            self._enabled = False
+
+    def gen_profiled_errors(self, model_name: str, errors) -> Generator:
+        """
+        switches to the profile of the model while @errors generator is running
+        """
+        if not self.per_model:
+            yield from errors
+            return
+
+        profile = self.models.setdefault(model_name, cProfile.Profile())
+        errors = iter(errors)
+        while True:
+            # only one profile can be active at the same time
+            if self._enabled:
+                self.profile.disable()
+            profile.enable()
+            try:
+                error = next(errors)
+            except StopIteration:
+                return
+            finally:
+                profile.disable()
+                if self._enabled:
+                    self.profile.enable()
+            yield error
+
+    def get_stats(self) -> pstats.Stats:
+        """
+        stats of the whole run (main and models profiles)
+        """
+        stats = pstats.Stats(self.profile)
+        for profile in self.models.values():
+            stats.add(profile)
+        return stats
+
+    def dump(self, path: str) -> List[str]:
+        """
+        writes the stats of the whole run to @path
+        and the stats of every model (with @per_model) to "@path.app.Model"
+
+        returns the written paths
+        """
+        self.get_stats().dump_stats(path)
+        paths = [path]
+        for model_name, profile in sorted(self.models.items()):
+            model_path = "{}.{}".format(path, model_name)
+            profile.dump_stats(model_path)
+            paths.append(model_path)
+        return paths
@@ -0,0 +1,112 @@
+"""
+Retention of resolved ConsistencyFail rows (see consistency_model_purge command).
+"""
+
+import datetime
+import json
+from typing import IO, Optional
+
+from django.db import models, transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .budget import ScanBudget
+from .settings import FAIL_RETENTION_DAYS, PURGE_BATCH_SIZE
+
+
+def _archive_fails(fails, archive: IO[str]) -> None:
+    """
+    writes @fails to @archive as JSON lines
+    """
+    for fail in fails.select_related("content_type").order_by("pk"):
+        record = {
+            "id": fail.pk,
+            "created_on": fail.created_on.isoformat(),
+            "updated_on": fail.updated_on.isoformat(),
+            "resolved_on": fail.resolved_on.isoformat(),
+            "model": "{}.{}".format(
+                fail.content_type.app_label, fail.content_type.model
+            ),
+            "object_id": fail.object_id,
+            "validator_name": fail.validator_name,
+            "message": fail.message,
+        }
+        archive.write(json.dumps(record) + "\n")
+    archive.flush()
+
+
+def _rollup_fails(fails) -> None:
+    """
+    adds the number of resolved fails per day, model and validator
+    to ConsistencyFailDaily
+    """
+    from .models import ConsistencyFailDaily
+
+    counts = fails.values(
+        "content_type_id", "validator_name", date=TruncDate("resolved_on")
+    ).annotate(count=models.Count("pk"))
+    for row in counts.order_by():
+        count = row.pop("count")
+        updated = ConsistencyFailDaily.objects.filter(**row).update(
+            resolved=models.F("resolved") + count
+        )
+        if not updated:
+            ConsistencyFailDaily.objects.create(resolved=count, **row)
+
+
+def purge_resolved_fails(
+    days: Optional[float] = None,
+    batch_size: Optional[int] = None,
+    archive: Optional[IO[str]] = None,
+    rollup: bool = False,
+    budget: Optional[ScanBudget] = None,
+) -> int:
+    """
+    deletes fails resolved more than @days ago (CONSISTENCY_FAIL_RETENTION_DAYS by default).
+
+    Fails are deleted by pk ranges of @batch_size, every range in its own short
+    transaction, so the table is never locked for long.
+
+    @archive - file the deleted fails are written to as JSON lines before they are deleted
+    @rollup - the deleted fails are counted in ConsistencyFailDaily first
+    @budget - paces the purge and stops it when the time is over
+
+    returns the number of deleted fails
+    """
+    from .models import ConsistencyFail
+
+    if days is None:
+        days = FAIL_RETENTION_DAYS
+    assert days is not None, "days or CONSISTENCY_FAIL_RETENTION_DAYS is required"
+    if batch_size is None:
+        batch_size = PURGE_BATCH_SIZE
+
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    expired = ConsistencyFail.objects.filter(resolved=True, resolved_on__lt=cutoff)
+    pk_range = expired.aggregate(first=models.Min("pk"), last=models.Max("pk"))
+    if pk_range["first"] is None:
+        return 0
+
+    deleted = 0
+    lo = pk_range["first"]
+    while lo <= pk_range["last"]:
+        if budget is not None and not budget.check():
+            break
+        hi = lo + batch_size
+        with transaction.atomic():
+            fails = expired.filter(pk__gte=lo, pk__lt=hi)
+            if archive is not None:
+                _archive_fails(fails, archive)
+            if rollup:
+                _rollup_fails(fails)
+            count = fails.delete()[0]
+        deleted += count
+        lo = hi
+        if not count:
+            # skip the gap of pks
+            lo = expired.filter(pk__gte=hi).aggregate(first=models.Min("pk"))["first"]
+            if lo is None:
+                break
+        if budget is not None:
+            budget.pace(count)
+    return deleted
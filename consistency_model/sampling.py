@@ -0,0 +1,157 @@
+"""
+Random sampling of objects (see ConsistencyChecker.sample_size)
+and estimates of failure rates of validators.
+"""
+
+import math
+import random
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from django.db import connections, models
+
+# z-score of the 95% confidence interval
+Z_95 = 1.96
+
+# more pks than needed are drawn, some of them are filtered out by the queryset
+SAMPLE_MARGIN = 1.25
+# how many times the random pks are drawn to collect the sample
+SAMPLE_ATTEMPTS = 10
+# max number of pks in one query
+SAMPLE_BATCH_SIZE = 500
+
+
+def get_tablesample_pks(queryset, size: int) -> Optional[List[Any]]:
+    """
+    random pks of @queryset selected with TABLESAMPLE BERNOULLI on PostgreSQL.
+
+    None if the backend doesn't support it or the table was never analyzed
+    (the number of rows is unknown)
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+            [quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+        if not row or row[0] <= 0:
+            return None
+        percent = min(100.0, 100.0 * size * SAMPLE_MARGIN / row[0])
+        cursor.execute(
+            "SELECT {} FROM {} TABLESAMPLE BERNOULLI (%s)".format(
+                quote_name(model._meta.pk.column), quote_name(model._meta.db_table)
+            ),
+            [percent],
+        )
+        pks = [row[0] for row in cursor.fetchall()]
+
+    pks = _filter_pks(queryset, pks)
+    return random.sample(pks, min(size, len(pks)))
+
+
+def get_random_pks(queryset, size: int) -> List[Any]:
+    """
+    random pks of @queryset, works with any backend.
+
+    integer pks are drawn uniformly from the pk range and the missing ones are skipped,
+    other pks are selected with ORDER BY random()
+    """
+    pk_range = queryset.aggregate(first=models.Min("pk"), last=models.Max("pk"))
+    first, last = pk_range["first"], pk_range["last"]
+    if first is None:
+        return []
+
+    if not isinstance(first, int):
+        return list(queryset.order_by("?").values_list("pk", flat=True)[:size])
+
+    range_size = last - first + 1
+    pks: Set[int] = set()
+    drawn = found = 0
+    for _ in range(SAMPLE_ATTEMPTS):
+        need = size - len(pks)
+        if need <= 0:
+            break
+        # share of the drawn pks that exist in the queryset
+        density = max(found, 1) / drawn if drawn else 1
+        count = math.ceil(need * SAMPLE_MARGIN / density)
+        if count >= range_size:
+            # the whole range is cheaper than the random pks
+            pks_list = list(queryset.order_by().values_list("pk", flat=True))
+            return random.sample(pks_list, min(size, len(pks_list)))
+
+        candidates = list({random.randint(first, last) for _ in range(count)} - pks)
+        new_pks = _filter_pks(queryset, candidates)
+        drawn += len(candidates)
+        found += len(new_pks)
+        pks.update(new_pks)
+
+    pks_list = list(pks)
+    return random.sample(pks_list, min(size, len(pks_list)))
+
+
+def _filter_pks(queryset, pks: List[Any]) -> List[Any]:
+    """
+    @pks that are in @queryset
+    """
+    queryset = queryset.order_by()
+    result = []
+    for i in range(0, len(pks), SAMPLE_BATCH_SIZE):
+        batch = pks[i : i + SAMPLE_BATCH_SIZE]
+        result.extend(queryset.filter(pk__in=batch).values_list("pk", flat=True))
+    return result
+
+
+def estimate_failure_rate(
+    failures: int, total: int, z: float = Z_95
+) -> Tuple[float, float, float]:
+    """
+    (rate, low, high) - failure rate of the sample and Wilson score interval of the rate
+    """
+    if not total:
+        return 0.0, 0.0, 1.0
+
+    rate = failures / total
+    denominator = 1 + z * z / total
+    center = (rate + z * z / (2 * total)) / denominator
+    margin = (
+        z * math.sqrt(rate * (1 - rate) / total + z * z / (4 * total * total))
+    ) / denominator
+    return rate, max(0.0, center - margin), min(1.0, center + margin)
+
+
+def get_failure_estimates(
+    stats: Dict[str, int], failed_objects: Dict[str, Set[Any]]
+) -> List[Dict[str, Any]]:
+    """
+    estimated failure rates of the validators of the sampled models.
+
+    @stats - stats of gen_consistency_errors, "sample.app.Model" is the size of the sample
+    @failed_objects - validator "app.Model.func" => pks of the objects with errors
+    """
+    rows = []
+    for stats_k in sorted(stats):
+        if not stats_k.startswith("check."):
+            continue
+        validator_name = stats_k[len("check.") :]
+        model_name = validator_name.rsplit(".", 1)[0]
+        total = stats.get("sample." + model_name)
+        if total is None:
+            continue
+        failures = len(failed_objects.get(validator_name, ()))
+        rate, low, high = estimate_failure_rate(failures, total)
+        rows.append(
+            {
+                "name": validator_name,
+                "failures": failures,
+                "total": total,
+                "rate": rate,
+                "low": low,
+                "high": high,
+            }
+        )
+    return rows
@@ -4,6 +4,28 @@ DEFAULT_MONITORING_LIMIT = getattr(
     settings, "CONSISTENCY_DEFAULT_MONITORING_LIMIT", 10_000
 )
 DEFAULT_ORDER_BY = getattr(settings, "CONSISTENCY_DEFAULT_ORDER_BY", "-id")
+DEFAULT_CHUNK_SIZE = getattr(settings, "CONSISTENCY_DEFAULT_CHUNK_SIZE", None)
+MONITORING_BATCH_SIZE = getattr(settings, "CONSISTENCY_MONITORING_BATCH_SIZE", 1000)
+MONITORING_POST_SAVE = getattr(settings, "CONSISTENCY_MONITORING_POST_SAVE", True)
+MONITORING_MAX_SECONDS = getattr(settings, "CONSISTENCY_MONITORING_MAX_SECONDS", None)
+MONITORING_MAX_ROWS_PER_SECOND = getattr(
+    settings, "CONSISTENCY_MONITORING_MAX_ROWS_PER_SECOND", None
+)
+RESULT_CACHE_PATH = getattr(settings, "CONSISTENCY_RESULT_CACHE_PATH", None)
+RESULT_CACHE_TTL = getattr(settings, "CONSISTENCY_RESULT_CACHE_TTL", 7 * 24 * 3600)
+RESULT_CACHE_MAX_ENTRIES = getattr(
+    settings, "CONSISTENCY_RESULT_CACHE_MAX_ENTRIES", 10_000_000
+)
+FAIL_RETENTION_DAYS = getattr(settings, "CONSISTENCY_FAIL_RETENTION_DAYS", None)
+PURGE_BATCH_SIZE = getattr(settings, "CONSISTENCY_PURGE_BATCH_SIZE", 1000)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = getattr(
+    settings, "CONSISTENCY_ADMIN_ESTIMATED_COUNT_THRESHOLD", 100_000
+)
+ADMIN_SUMMARY_CACHE_SECONDS = getattr(
+    settings, "CONSISTENCY_ADMIN_SUMMARY_CACHE_SECONDS", 60
+)
+DAEMON_INTERVAL = getattr(settings, "CONSISTENCY_DAEMON_INTERVAL", 3600)
+DAEMON_JITTER = getattr(settings, "CONSISTENCY_DAEMON_JITTER", 0.1)
 DEFAULT_CHECKER = getattr(
     settings,
     "CONSISTENCY_DEFAULT_CHECKER",
@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+# sent by monitoring after new ConsistencyFail objects are created in bulk.
+# bulk_create doesn't send pre_save/post_save, monitoring sends post_save(created=True)
+# for every new fail only for compatibility (CONSISTENCY_MONITORING_POST_SAVE),
+# use this signal instead.
+# kwargs: fails - list of the new ConsistencyFail objects
+consistency_fails_created = Signal()
@@ -0,0 +1,228 @@
+"""
+Instrumentation of the validation engine
+(see gen_consistency_errors @timings and @queries).
+"""
+
+import math
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from functools import wraps
+from typing import Any, Dict, Generator, List
+
+from django.db import connections
+
+try:
+    thread_time = time.thread_time
+except AttributeError:  # python 3.6 on some platforms
+    thread_time = time.process_time
+
+# latency histogram buckets grow by 5%, so percentiles have the same precision
+BUCKET_BASE = 1.05
+# the smallest latency of the histogram is 1 microsecond
+BUCKET_MIN = 1e-6
+
+
+class Timing:
+    """
+    wall time, CPU time, number of objects and latency histogram of one validator or model
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.histogram: Dict[int, int] = defaultdict(int)
+
+    def add_time(self, wall: float, cpu: float) -> None:
+        self.wall += wall
+        self.cpu += cpu
+
+    def add(self, wall: float, cpu: float, count: int = 1) -> None:
+        """
+        adds one measured call that checked @count objects
+        """
+        self.count += count
+        self.wall += wall
+        self.cpu += cpu
+        if wall > BUCKET_MIN:
+            bucket = int(math.log(wall / BUCKET_MIN, BUCKET_BASE)) + 1
+        else:
+            bucket = 0
+        self.histogram[bucket] += 1
+
+    def percentile(self, p: float) -> float:
+        """
+        latency (upper bound of the histogram bucket) in seconds
+        """
+        total = sum(self.histogram.values())
+        if not total:
+            return 0.0
+        rank = total * p / 100
+        seen = 0
+        for bucket in sorted(self.histogram):
+            seen += self.histogram[bucket]
+            if seen >= rank:
+                break
+        return BUCKET_MIN * BUCKET_BASE**bucket
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class ValidationTimings:
+    """
+    collects timings of the validators (every call) and the models
+    (engine time to load and check objects, time in the consumer of errors is excluded).
+
+    Latency percentiles are collected for validators only,
+    for a query validator they are measured per query.
+    """
+
+    def __init__(self) -> None:
+        self.validators: Dict[str, Timing] = defaultdict(Timing)
+        self.models: Dict[str, Timing] = defaultdict(Timing)
+
+    def wrap_validator(self, func, validator_name: str):
+        timing = self.validators[validator_name]
+
+        @wraps(func)
+        def _(obj):
+            wall, cpu = time.perf_counter(), thread_time()
+            try:
+                return func(obj)
+            finally:
+                timing.add(time.perf_counter() - wall, thread_time() - cpu)
+
+        return _
+
+    def gen_counted_objects(self, model_name: str, objects) -> Generator:
+        timing = self.models[model_name]
+        for obj in objects:
+            timing.count += 1
+            yield obj
+
+    def gen_timed_errors(self, model_name: str, errors) -> Generator:
+        """
+        measures the time spent in @errors generator of the model
+        """
+        timing = self.models[model_name]
+        errors = iter(errors)
+        while True:
+            wall, cpu = time.perf_counter(), thread_time()
+            try:
+                error = next(errors)
+            except StopIteration:
+                timing.add_time(time.perf_counter() - wall, thread_time() - cpu)
+                return
+            timing.add_time(time.perf_counter() - wall, thread_time() - cpu)
+            timing.errors += 1
+            yield error
+
+    def report(self) -> List[Dict[str, Any]]:
+        """
+        list of timings of models and validators sorted by wall time
+        """
+        rows = [
+            dict(kind=kind, name=name, **timing.as_dict())
+            for kind, timings in (
+                ("model", self.models),
+                ("validator", self.validators),
+            )
+            for name, timing in timings.items()
+        ]
+        return sorted(rows, key=lambda row: row["wall"], reverse=True)
+
+    def format_report(self) -> str:
+        lines = []
+        for row in self.report():
+            line = (
+                "{kind} {name}: count={count} errors={errors} "
+                "wall={wall:.3f}s cpu={cpu:.3f}s".format(**row)
+            )
+            if row["kind"] == "validator":
+                line += " p50={:.1f}us p95={:.1f}us p99={:.1f}us".format(
+                    row["p50"] * 1e6, row["p95"] * 1e6, row["p99"] * 1e6
+                )
+            lines.append(line)
+        return "\n".join(lines)
+
+
+class QueriesCount:
+    """
+    number of calls, SQL queries and DB time of one validator
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.queries = 0
+        self.db_time = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        queries_per_object = self.queries / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "queries": self.queries,
+            "db_time": self.db_time,
+            "queries_per_object": queries_per_object,
+            # one or more queries for every object usually means N+1 problem
+            "n_plus_one": queries_per_object >= 1,
+        }
+
+
+class ValidationQueries:
+    """
+    counts SQL queries executed by python validators
+    using connection.execute_wrapper around every validator call
+    """
+
+    def __init__(self) -> None:
+        self.validators: Dict[str, QueriesCount] = defaultdict(QueriesCount)
+
+    def wrap_validator(self, func, validator_name: str):
+        counter = self.validators[validator_name]
+
+        def execute(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                counter.queries += 1
+                counter.db_time += time.perf_counter() - start
+
+        @wraps(func)
+        def _(obj):
+            counter.count += 1
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(execute))
+                return func(obj)
+
+        return _
+
+    def report(self) -> List[Dict[str, Any]]:
+        """
+        list of query counts of validators sorted by number of queries
+        """
+        rows = [
+            dict(name=name, **counter.as_dict())
+            for name, counter in self.validators.items()
+        ]
+        return sorted(rows, key=lambda row: row["queries"], reverse=True)
+
+    def format_report(self) -> str:
+        return "\n".join(
+            "{name}: count={count} queries={queries} db={db_time:.3f}s "
+            "queries/object={queries_per_object:.2f}".format(**row)
+            + (" N+1" if row["n_plus_one"] else "")
+            for row in self.report()
+        )
@@ -1,6 +1,14 @@
+import copy
+import hashlib
+import json
+import threading
+import time
 from collections import defaultdict
 from contextlib import contextmanager
+from functools import partial
+from itertools import chain
 from typing import (
+    TYPE_CHECKING,
     Any,
     Callable,
     Dict,
@@ -13,12 +21,54 @@ from typing import (
 )
 
 from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
 from django.db import models
 from django.db.models.base import Model
-from django.db.models.query import QuerySet
+from django.db.models.query import QuerySet, prefetch_related_objects
 from django.utils.module_loading import import_string
 
-from .settings import DEFAULT_MONITORING_LIMIT, DEFAULT_ORDER_BY, DEFAULT_CHECKER
+try:
+    from contextvars import ContextVar, Token
+except ImportError:  # python 3.6
+
+    class ContextVar(threading.local):  # type: ignore[no-redef]
+        """
+        per thread replacement of contextvars.ContextVar.
+        the token of set() is the previous value.
+        """
+
+        def __init__(self, name, default=None):
+            self.value = default
+
+        def get(self):
+            return self.value
+
+        def set(self, value):
+            token = self.value
+            self.value = value
+            return token
+
+        def reset(self, token):
+            self.value = token
+
+
+from .budget import PACE_CHUNK_SIZE, ScanBudget
+
+if TYPE_CHECKING:
+    from .models import ConsistencyScanCursor
+from .sampling import get_random_pks, get_tablesample_pks
+from .timings import thread_time
+from .settings import (
+    DEFAULT_MONITORING_LIMIT,
+    DEFAULT_ORDER_BY,
+    DEFAULT_CHECKER,
+    DEFAULT_CHUNK_SIZE,
+    MONITORING_BATCH_SIZE,
+    MONITORING_MAX_SECONDS,
+    MONITORING_MAX_ROWS_PER_SECOND,
+    MONITORING_POST_SAVE,
+    RESULT_CACHE_PATH,
+)
 
 TValidators = Generator[
     Tuple[Tuple[str, str], List[Callable[[Any], Optional[bool]]]], None, None
@@ -30,6 +80,9 @@ VALIDATORS: Dict[Tuple[str, str], List[Callable[[Any], Optional[bool]]]] = defau
     list
 )
 
+# max number of pks in one query of query validators
+QUERY_VALIDATOR_BATCH_SIZE = 500
+
 # all checkers in the system.
 # Model => ConsistencyChecker(Model)
 CONSISTENCY_CHECKERS = {}
@@ -43,6 +96,28 @@ class ConsistencyChecker:
     limit = DEFAULT_MONITORING_LIMIT
     order_by = DEFAULT_ORDER_BY
     queryset = None
+    # None - load all of the objects with one query,
+    # int - stream objects by chunks of that size
+    chunk_size = DEFAULT_CHUNK_SIZE
+    # relations for QuerySet.select_related/prefetch_related
+    select_related: Iterable[str] = ()
+    prefetch_related: Iterable[str] = ()
+    # not nullable field that grows when object is changed (e.g. "modified_on").
+    # monitoring checks only objects changed since the previous run.
+    # None - incremental monitoring is disabled
+    incremental_field: Optional[str] = None
+    # restriction of the objects for sharded execution (see get_shards):
+    # ("pks", [pk, ...]) or ("range", first_pk, last_pk or None). None - no restriction
+    shard: Optional[tuple] = None
+    # check a random sample of that many objects of the queryset
+    # instead of the first limit objects (see get_sample). None - no sampling
+    sample_size: Optional[int] = None
+    # split the objects into that many pk ranges and check the next range
+    # on every monitoring run (see get_rolling_shard). None - rolling is disabled
+    rolling_buckets: Optional[int] = None
+    # seconds between the checks of the model by consistency_model_monitoring --daemon.
+    # None - CONSISTENCY_DAEMON_INTERVAL
+    interval: Optional[float] = None
 
     def __init__(self, cls, **kwargs) -> None:
         self.cls = cls
@@ -59,14 +134,373 @@ class ConsistencyChecker:
 
         return self.cls.objects.all().order_by(*order_by)
 
-    def get_objects(self):
+    def get_incremental_field(self) -> models.Field:
+        """
+        the field of incremental_field.
+
+        The field can't be nullable: the rows with NULL are never after a checkpoint,
+        so they would never be checked
+        """
+        field = self.cls._meta.get_field(self.incremental_field)
+        if field.null:
+            raise ValueError(
+                "incremental_field {}.{} can't be nullable".format(
+                    self.cls._meta.label, field.name
+                )
+            )
+        return field
+
+    def get_incremental_queryset(self, checkpoint=None):
+        """
+        queryset of objects changed after @checkpoint ordered by incremental_field.
+
+        @checkpoint - (value, pk) from get_checkpoint or None to start from the beginning
+        """
+        field = self.get_incremental_field()
         queryset = self.get_queryset()
 
+        if field.primary_key:
+            queryset = queryset.order_by("pk")
+            if checkpoint is not None:
+                queryset = queryset.filter(pk__gt=field.to_python(checkpoint[1]))
+            return queryset
+
+        queryset = queryset.order_by(field.name, "pk")
+        if checkpoint is not None:
+            value = field.to_python(checkpoint[0])
+            pk = self.cls._meta.pk.to_python(checkpoint[1])
+            queryset = queryset.filter(
+                models.Q(**{field.name + "__gt": value})
+                | models.Q(**{field.name: value, "pk__gt": pk})
+            )
+        return queryset
+
+    def get_checkpoint(self, obj) -> Tuple[str, str]:
+        """
+        checkpoint (value of incremental_field, pk) of the object as strings
+        """
+        field = self.get_incremental_field()
+        return field.value_to_string(obj), self.cls._meta.pk.value_to_string(obj)
+
+    def get_objects_queryset(
+        self,
+        fields=None,
+        select_related=(),
+        prefetch_related=(),
+        incremental=False,
+        checkpoint=None,
+        after_pk=None,
+        until_pk=None,
+    ):
+        """
+        queryset that loads only @fields (all of the fields if None)
+        with select_related/prefetch_related of the checker and the arguments.
+
+        @incremental - objects changed after @checkpoint (see get_incremental_queryset)
+
+        @after_pk - objects after that pk in the order of the queryset
+        (the queryset has to be ordered by pk, see is_resumable)
+
+        @until_pk - objects up to that pk (included) in the order of the queryset
+        (the queryset has to be ordered by pk, see is_resumable)
+        """
+        if incremental:
+            queryset = self.get_incremental_queryset(checkpoint)
+        else:
+            queryset = self.get_queryset()
+
+        if after_pk is not None or until_pk is not None:
+            keyset_field = self.get_keyset_field(queryset)
+            assert keyset_field is not None, "the queryset is not ordered by pk"
+            descending = keyset_field == "-pk"
+            if after_pk is not None:
+                lookup = "pk__lt" if descending else "pk__gt"
+                queryset = queryset.filter(**{lookup: after_pk})
+            if until_pk is not None:
+                lookup = "pk__gte" if descending else "pk__lte"
+                queryset = queryset.filter(**{lookup: until_pk})
+
+        if self.shard is not None:
+            if self.shard[0] == "pks":
+                queryset = queryset.filter(pk__in=self.shard[1])
+            else:
+                queryset = queryset.filter(pk__gte=self.shard[1])
+                if self.shard[2] is not None:
+                    queryset = queryset.filter(pk__lte=self.shard[2])
+
+        select_related = _merge_lookups(self.select_related, select_related)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+
+        prefetch_related = _merge_lookups(self.prefetch_related, prefetch_related)
+
+        if fields:
+            # the relations have to be loaded to be traversed by select_related
+            # and prefetch_related
+            fields = _merge_lookups(
+                fields,
+                [lookup.split("__")[0] for lookup in select_related],
+                _get_prefetch_fields(queryset.model, prefetch_related),
+            )
+            queryset = queryset.only(*fields)
+
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+
+        return queryset
+
+    def get_objects(self, **kwargs):
+        """
+        objects for validation.
+
+        @kwargs - arguments of get_objects_queryset
+        """
+        if self.chunk_size:
+            return chain.from_iterable(self.gen_chunks(**kwargs))
+
+        queryset = self.get_objects_queryset(**kwargs)
+
         if self.limit is None:
             return queryset
 
         return queryset[: self.limit]
 
+    def get_shards(self, count: int) -> List[Optional[tuple]]:
+        """
+        splits objects of the checker into about @count shards (see shard attribute).
+
+        with limit or sample_size the checked pks are split into lists,
+        otherwise integer pk range of the queryset is split into ranges.
+        [None] means the objects can not be split.
+        """
+        queryset = self.get_queryset()
+        if self.sample_size or self.limit is not None:
+            if self.sample_size:
+                pks = self.get_sample_pks(self.sample_size)
+            else:
+                pks = list(queryset.values_list("pk", flat=True)[: self.limit])
+            size = max(1, -(-len(pks) // count))
+            return [("pks", pks[i : i + size]) for i in range(0, len(pks), size)]
+
+        pk_range = queryset.aggregate(first=models.Min("pk"), last=models.Max("pk"))
+        first, last = pk_range["first"], pk_range["last"]
+        if first is None:
+            return []
+        if not isinstance(first, int):
+            return [None]
+
+        step = max(1, -(-(last - first + 1) // count))
+        shards: List[Optional[tuple]] = [
+            ("range", pk, min(pk + step - 1, last))
+            for pk in range(first, last + 1, step)
+        ]
+        if self.get_keyset_field(queryset) == "-pk":
+            shards.reverse()
+        return shards
+
+    def get_shard(self, shard: Optional[tuple]) -> "ConsistencyChecker":
+        """
+        copy of the checker that checks only objects of @shard from get_shards
+        """
+        checker = copy.copy(self)
+        if shard is not None:
+            checker.shard = shard
+            checker.limit = None
+        return checker
+
+    def get_sample_pks(self, size: int) -> List[Any]:
+        """
+        pks of @size random objects of the queryset.
+        TABLESAMPLE is used if the DB supports it, random pks otherwise
+        """
+        queryset = self.get_queryset()
+        pks = get_tablesample_pks(queryset, size)
+        if pks is None:
+            pks = get_random_pks(queryset, size)
+        return pks
+
+    def get_sample(self):
+        """
+        copy of the checker that checks a new random sample of sample_size objects
+        """
+        return self.get_shard(("pks", self.get_sample_pks(self.sample_size)))
+
+    def get_rolling_shard(
+        self, plan: Optional[Dict[str, int]] = None
+    ) -> Tuple[Optional[tuple], Optional[Dict[str, int]]]:
+        """
+        (shard, plan) of the next bucket of the rolling scan.
+
+        @plan - {"bucket", "buckets", "first", "width"} of the previous run or None.
+        A new plan is made from the current pk range when a cycle starts.
+        The last bucket has no upper bound, so the objects created during the cycle
+        are checked as well.
+
+        The shard is None if the objects can't be split (not integer pk)
+        """
+        if (
+            plan is None
+            or plan["bucket"] >= plan["buckets"]
+            or plan["buckets"] != self.rolling_buckets
+        ):
+            pk_range = self.get_queryset().aggregate(
+                first=models.Min("pk"), last=models.Max("pk")
+            )
+            first, last = pk_range["first"], pk_range["last"]
+            if first is None:
+                return ("pks", []), None
+            if not isinstance(first, int):
+                return None, None
+            buckets = self.rolling_buckets
+            assert buckets, "rolling_buckets is required"
+            width = max(1, -(-(last - first + 1) // buckets))
+            plan = {"bucket": 0, "buckets": buckets, "first": first, "width": width}
+
+        first_pk = plan["first"] + plan["bucket"] * plan["width"]
+        last_pk = None
+        if plan["bucket"] < plan["buckets"] - 1:
+            last_pk = first_pk + plan["width"] - 1
+        return ("range", first_pk, last_pk), plan
+
+    def get_window_last_pk(self, **kwargs) -> Any:
+        """
+        pk of the last object of the first limit objects of the queryset
+        ordered by pk. None without limit or objects.
+
+        @kwargs - arguments of get_objects_queryset
+        """
+        if self.limit is None:
+            return None
+        queryset = (
+            self.get_objects_queryset(**kwargs)
+            .select_related(None)
+            .prefetch_related(None)
+            .values_list("pk", flat=True)
+        )
+        pks = list(queryset[self.limit - 1 : self.limit])
+        if not pks:
+            # less than limit objects, the window ends with the last one
+            pks = list(queryset.reverse()[:1])
+        return pks[0] if pks else None
+
+    def is_resumable(self) -> bool:
+        """
+        True if a scan of the objects can be continued from the last checked pk
+        """
+        return self.get_keyset_field(self.get_queryset()) is not None
+
+    def get_keyset_field(self, queryset) -> Optional[str]:
+        """
+        returns the ordering ("pk" or "-pk") if queryset can be paginated by pk,
+        otherwise None
+        """
+        if not queryset.query.can_filter():
+            return None
+
+        order_by = tuple(queryset.query.order_by)
+        if len(order_by) != 1 or not isinstance(order_by[0], str):
+            return None
+
+        pk_names = ("pk", queryset.model._meta.pk.attname)
+        if order_by[0] in pk_names:
+            return "pk"
+        if order_by[0].startswith("-") and order_by[0][1:] in pk_names:
+            return "-pk"
+        return None
+
+    def gen_chunks(self, **kwargs) -> Generator[List[Model], None, None]:
+        """
+        generates lists of objects of size chunk_size.
+
+        queryset ordered by pk is paginated by keyset (pk > last pk),
+        any other queryset is streamed with QuerySet.iterator.
+        prefetch_related is applied to every chunk.
+
+        @kwargs - arguments of get_objects_queryset
+        """
+        queryset = self.get_objects_queryset(**kwargs)
+        chunk_size = self.chunk_size
+        limit = self.limit
+
+        if not chunk_size:
+            objects = list(queryset if limit is None else queryset[:limit])
+            if objects:
+                yield objects
+            return
+
+        prefetch_related = queryset._prefetch_related_lookups
+        if prefetch_related:
+            queryset = queryset.prefetch_related(None)
+
+        for chunk in self._gen_chunks(queryset, chunk_size, limit):
+            if prefetch_related:
+                prefetch_related_objects(chunk, *prefetch_related)
+            yield chunk
+
+    def _gen_chunks(self, queryset, chunk_size, limit):
+        keyset_field = self.get_keyset_field(queryset)
+        if keyset_field is None:
+            if limit is not None:
+                queryset = queryset[:limit]
+            chunk = []
+            for obj in queryset.iterator(chunk_size=chunk_size):
+                chunk.append(obj)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+            return
+
+        lookup = "pk__lt" if keyset_field == "-pk" else "pk__gt"
+        queryset = queryset.order_by(keyset_field)
+        last_pk = None
+        while limit is None or limit > 0:
+            size = chunk_size if limit is None else min(chunk_size, limit)
+            chunk_queryset = queryset
+            if last_pk is not None:
+                chunk_queryset = queryset.filter(**{lookup: last_pk})
+            chunk = list(chunk_queryset[:size])
+            if not chunk:
+                return
+            yield chunk
+            if len(chunk) < size:
+                return
+            last_pk = chunk[-1].pk
+            if limit is not None:
+                limit -= len(chunk)
+
+
+def _merge_lookups(*lookups_list) -> List[str]:
+    """
+    merges iterables of lookups (field names) saving the order and skipping duplicates
+    """
+    result = []
+    for lookups in lookups_list:
+        for lookup in lookups:
+            if lookup not in result:
+                result.append(lookup)
+    return result
+
+
+def _get_prefetch_fields(model, prefetch_related) -> List[str]:
+    """
+    fields of @model the @prefetch_related lookups start from:
+    forward relations and the fields of generic foreign keys
+    """
+    fields = []
+    for lookup in prefetch_related:
+        lookup = getattr(lookup, "prefetch_through", lookup)
+        try:
+            field = model._meta.get_field(lookup.split("__")[0])
+        except FieldDoesNotExist:
+            continue
+        if getattr(field, "fk_field", None) is not None:
+            fields.extend([field.ct_field, field.fk_field])
+        elif field.concrete and (field.many_to_one or field.one_to_one):
+            fields.append(field.name)
+    return fields
+
 
 def _register_consistency(cls, cls_checker=None, **kwargs):
     if cls_checker is None:
@@ -75,6 +509,8 @@ def _register_consistency(cls, cls_checker=None, **kwargs):
 
     assert issubclass(cls, Model)
     assert isinstance(new_checker, ConsistencyChecker)
+    if new_checker.incremental_field is not None:
+        new_checker.get_incremental_field()
 
     CONSISTENCY_CHECKERS[cls] = new_checker
     return new_checker
@@ -109,7 +545,9 @@ def get_register_consistency(cls):
     return _register_consistency(cls)
 
 
-_ERRORS = []
+# list of (message, name) the current validator collects with consistency_error.
+# every thread and asyncio task has its own value
+_ERRORS: ContextVar = ContextVar("consistency_errors", default=None)
 
 
 def consistency_error(message: Any = "", name: Optional[str] = None) -> None:
@@ -121,8 +559,9 @@ def consistency_error(message: Any = "", name: Optional[str] = None) -> None:
     the name is using for consistency_model_monitoring command
     """
     assert name is None or "." not in name, "(dot) can't be part of the name"
-    global _ERRORS
-    _ERRORS.append((message, name))
+    errors = _ERRORS.get()
+    if errors is not None:
+        errors.append((message, name))
 
 
 @contextmanager
@@ -130,26 +569,103 @@ def trace_consistency_errors():
     """
     context manager for catching consistency_error calls
     """
-    global _ERRORS
-    prev_errors = _ERRORS
-    errors = _ERRORS = []
+    errors = []
+    token = _ERRORS.set(errors)
     try:
         yield errors
     finally:
-        _ERRORS = prev_errors
+        _ERRORS.reset(token)
 
 
-def consistency_validator(func):
+def consistency_validator(
+    func=None,
+    *,
+    fields: Optional[Iterable[str]] = None,
+    select_related: Iterable[str] = (),
+    prefetch_related: Iterable[str] = (),
+):
     """
     decorator for model's method that register that function as consistency validator
+
+    @fields - names of the model fields the validator reads.
+    If all validators of the model declare fields, only those fields are loaded.
+
+    @select_related, @prefetch_related - relations the validator traverses.
+    They are added to the checker queryset.
     """
+    if func is None:
+        return partial(
+            consistency_validator,
+            fields=fields,
+            select_related=select_related,
+            prefetch_related=prefetch_related,
+        )
+
     model = func.__qualname__.split(".")[0]
     app = func.__module__.split(".")[-2]
 
+    func.consistency_fields = None if fields is None else tuple(fields)
+    func.consistency_select_related = tuple(select_related)
+    func.consistency_prefetch_related = tuple(prefetch_related)
     VALIDATORS[(app, model)].append(func)
     return func
 
 
+def consistency_query_validator(func=None, *, message: Any = ""):
+    """
+    decorator for model's method that register that function as query validator.
+
+    The method gets the model class and returns Q object that consistent rows match.
+    The validator is evaluated by DB as filter(~Q), only inconsistent rows are loaded.
+
+    @message - error message for every inconsistent row
+    """
+    if func is None:
+        return partial(consistency_query_validator, message=message)
+
+    func.consistency_query_message = message
+    return consistency_validator(func)
+
+
+def is_query_validator(func) -> bool:
+    return hasattr(func, "consistency_query_message")
+
+
+def get_validators_fields(list_funcs) -> Optional[List[str]]:
+    """
+    union of the fields declared by validators.
+    None if at least one validator doesn't declare fields.
+    """
+    fields: List[str] = []
+    for func in list_funcs:
+        func_fields = getattr(func, "consistency_fields", None)
+        if func_fields is None:
+            return None
+        fields = _merge_lookups(fields, func_fields)
+    return fields
+
+
+def get_validators_query_options(list_funcs) -> Dict[str, List[str]]:
+    """
+    fields, select_related and prefetch_related declared by validators
+    as kwargs for ConsistencyChecker.get_objects
+    """
+    options = {}
+
+    fields = get_validators_fields(list_funcs)
+    if fields:
+        options["fields"] = fields
+
+    for option in ("select_related", "prefetch_related"):
+        lookups = _merge_lookups(
+            *[getattr(func, "consistency_" + option, ()) for func in list_funcs]
+        )
+        if lookups:
+            options[option] = lookups
+
+    return options
+
+
 def gen_validators_by_model(names: Union[Iterable[str], str]) -> TValidators:
     """
     Generator of validators by model name(s).
@@ -226,6 +742,120 @@ def gen_validators(names: Union[Iterable[str], str]) -> TValidators:
             raise ValueError(f'Unknow format for name "{name}"')
 
 
+def _get_validators(
+    validators=None,
+    create_validators=None,
+    exclude_validators=None,
+    create_exclude_validators=None,
+) -> List[Tuple[Tuple[str, str], List[Callable[[Any], Optional[bool]]]]]:
+    """
+    returns list of ((app, model), [func, func, ...]) without excluded validators.
+
+    arguments are the same as for gen_consistency_errors
+    """
+    if create_validators is not None:
+        validators = gen_validators(create_validators)
+
+    if validators is None:
+        validators = VALIDATORS
+
+    if isinstance(validators, dict):
+        validators = validators.items()
+
+    if create_exclude_validators is not None:
+        exclude_validators = gen_validators(create_exclude_validators)
+
+    if exclude_validators is None:
+        exclude_validators = {}
+
+    if not isinstance(exclude_validators, dict):
+        exclude_validators = dict(exclude_validators)
+
+    result = []
+    for name, list_funcs in validators:
+        if name in exclude_validators:
+            exclude_funcs = exclude_validators[name]
+            list_funcs = list(set(list_funcs).difference(set(exclude_funcs)))
+
+        if list_funcs:
+            result.append((name, list_funcs))
+    return result
+
+
+def _validator_names_q(validators) -> models.Q:
+    """
+    Q object for ConsistencyFail that matches fails of @validators,
+    including named errors (app.Model.func.name)
+    """
+    q = models.Q(pk__in=[])
+    for (app_label, model), list_funcs in validators:
+        for func in list_funcs:
+            validator_name = "{}.{}.{}".format(app_label, model, func.__name__)
+            q |= models.Q(validator_name=validator_name)
+            q |= models.Q(validator_name__startswith=validator_name + ".")
+    return q
+
+
+class ModelValidationPlan:
+    """
+    validators of one model prepared for the validation loop
+    """
+
+    def __init__(self, name: Tuple[str, str], list_funcs) -> None:
+        app_label, model = name
+        self.name = name
+        self.cls = apps.get_model(app_label=app_label, model_name=model)
+        self.funcs = list_funcs
+        self.python_funcs = [f for f in list_funcs if not is_query_validator(f)]
+        self.query_funcs = [f for f in list_funcs if is_query_validator(f)]
+        self.python_names = [
+            "{}.{}.{}".format(app_label, model, f.__name__) for f in self.python_funcs
+        ]
+        self.query_options = get_validators_query_options(self.python_funcs)
+        self.checkpoint_key = get_checkpoint_key(self.cls, list_funcs)
+
+
+class ValidationPlan:
+    """
+    validators for gen_consistency_errors with applied filters and excludes,
+    resolved models and validator names.
+
+    The plan can be built once and used as @validators of many gen_consistency_errors calls.
+    Arguments are the same as for gen_consistency_errors.
+    """
+
+    def __init__(
+        self,
+        validators=None,
+        create_validators=None,
+        exclude_validators=None,
+        create_exclude_validators=None,
+    ) -> None:
+        self.models = [
+            ModelValidationPlan(name, list_funcs)
+            for name, list_funcs in _get_validators(
+                validators,
+                create_validators,
+                exclude_validators,
+                create_exclude_validators,
+            )
+        ]
+
+    def __iter__(self):
+        for model_plan in self.models:
+            yield model_plan.name, model_plan.funcs
+
+    def get_rolling_labels(self) -> List[str]:
+        """
+        labels of the models whose checkers have rolling_buckets
+        """
+        return [
+            model_plan.cls._meta.label
+            for model_plan in self.models
+            if get_register_consistency(model_plan.cls).rolling_buckets
+        ]
+
+
 def gen_consistency_errors(
     validators=None,
     objects=None,
@@ -233,6 +863,15 @@ def gen_consistency_errors(
     exclude_validators=None,
     create_exclude_validators=None,
     stats=None,
+    checkpoints=None,
+    checkers=None,
+    timings=None,
+    queries=None,
+    profile=None,
+    budget=None,
+    cursors=None,
+    rolling=None,
+    cache=None,
 ) -> Generator[Tuple[str, Any, Any], None, None]:
     """
     generates inconsistency errors based on project validators.
@@ -244,6 +883,7 @@ def gen_consistency_errors(
         * iterable of ((app:str, model:str), [func, func, ...])
         * dict of (app: str, model: str) => [func, func, ...]
         * None (default) - all project validators
+        * ValidationPlan
 
     @objects - objects we want to validate. All objects should be the same model
 
@@ -262,6 +902,39 @@ def gen_consistency_errors(
 
     @stats - link to an empty dict for collecting validation stats.
     Is using for commands.
+
+    @checkpoints - dict of checkpoints for incremental monitoring.
+    The models with checker.incremental_field are checked only from their checkpoint
+    and the checkpoints are updated while objects are checked.
+    None (default) means incremental monitoring is not used.
+
+    @checkers - dict of Model => ConsistencyChecker used instead of the registered checkers
+
+    @timings - ValidationTimings for collecting time of the models and the validators.
+    None (default) - the time is not measured
+
+    @queries - ValidationQueries for counting SQL queries of the validators.
+    None (default) - the queries are not counted
+
+    @profile - ValidationProfile, with per_model=True every model is profiled separately.
+    None (default) - the models are not profiled separately
+
+    @budget - ScanBudget, objects are checked by chunks that are paced by the budget
+    and the generation stops when the time of the budget is over.
+    None (default) - no limits
+
+    @cursors - ScanCursors, the models ordered by pk are checked from the cursor
+    of the previous scan by chunks and the cursor is moved after every chunk.
+    None (default) - the scan is not resumable
+
+    @rolling - RollingScan, the models with checker.rolling_buckets are checked
+    by the next bucket of their rolling scan. The models ordered by pk are checked
+    by chunks and a bucket stopped by @budget is continued from the last checked object.
+    None (default) - the rolling scans are not used
+
+    @cache - ValidationCache, python validators with declared fields are skipped
+    for the objects that passed them before with the same values of the fields.
+    None (default) - every object is validated
     """
 
     assert not (
@@ -275,113 +948,1151 @@ def gen_consistency_errors(
     else:
         objects_cls = objects[0]._meta.model
 
-    if create_validators is not None:
-        validators = gen_validators(create_validators)
+    if isinstance(validators, ValidationPlan) and (
+        exclude_validators is None and create_exclude_validators is None
+    ):
+        plan = validators
+    else:
+        plan = ValidationPlan(
+            validators, create_validators, exclude_validators, create_exclude_validators
+        )
 
-    if validators is None:
-        validators = VALIDATORS
+    for model_plan in plan.models:
+        cls_model = model_plan.cls
 
-    if isinstance(validators, dict):
-        validators = validators.items()
+        if objects_cls is not None and cls_model != objects_cls:
+            continue
 
-    if create_exclude_validators is not None:
-        exclude_validators = gen_validators(create_exclude_validators)
+        checker = None
+        if objects_cls is None:
+            checker = (checkers or {}).get(cls_model) or get_register_consistency(
+                cls_model
+            )
+            if (
+                checker.sample_size
+                and checker.shard is None
+                and (checkpoints is None or checker.incremental_field is None)
+            ):
+                checker = checker.get_sample()
+                if stats is not None:
+                    stats["sample." + cls_model._meta.label] = len(checker.shard[1])
+            elif (
+                rolling is not None
+                and checker.rolling_buckets
+                and checker.shard is None
+                and (checkpoints is None or checker.incremental_field is None)
+            ):
+                checker = rolling.get_checker(checker, model_plan.checkpoint_key)
+
+        errors = _gen_model_consistency_errors(
+            model_plan,
+            checker,
+            objects,
+            stats,
+            checkpoints,
+            timings,
+            queries,
+            budget=budget,
+            cursors=cursors,
+            rolling=rolling,
+            cache=cache,
+        )
+        if timings is not None:
+            errors = timings.gen_timed_errors(cls_model._meta.label, errors)
+        if profile is not None:
+            errors = profile.gen_profiled_errors(cls_model._meta.label, errors)
+        yield from errors
+
+        if rolling is not None and (budget is None or not budget.exhausted):
+            rolling.finish_bucket(model_plan.checkpoint_key)
+
+
+def _gen_model_consistency_errors(
+    model_plan,
+    checker,
+    objects=None,
+    stats=None,
+    checkpoints=None,
+    timings=None,
+    queries=None,
+    budget=None,
+    cursors=None,
+    rolling=None,
+    cache=None,
+) -> Generator[Tuple[str, Any, Any], None, None]:
+    """
+    generates inconsistency errors of one model.
+    @checker is None when @objects are set
+    """
+    if budget is not None and not budget.check():
+        return
 
-    if exclude_validators is None:
-        exclude_validators = {}
+    if (
+        checkpoints is not None
+        and checker is not None
+        and checker.incremental_field is not None
+    ):
+        yield from _gen_incremental_consistency_errors(
+            checker, model_plan, checkpoints, stats, timings, queries, budget, cache
+        )
+        return
+
+    if (
+        rolling is not None
+        and checker is not None
+        and rolling.has_bucket(model_plan.checkpoint_key)
+        and checker.is_resumable()
+    ):
+        yield from _gen_rolling_consistency_errors(
+            checker, model_plan, rolling, stats, timings, queries, budget, cache
+        )
+        return
+
+    if (
+        cursors is not None
+        and checker is not None
+        and checker.shard is None
+        and checker.is_resumable()
+    ):
+        yield from _gen_resumable_consistency_errors(
+            checker, model_plan, cursors, stats, timings, queries, budget, cache
+        )
+        return
+
+    objects_all: Iterable[models.Model]
+    if not model_plan.python_funcs:
+        objects_all = ()
+    elif objects is not None:
+        objects_all = objects
+    elif budget is not None:
+        if not checker.chunk_size:
+            checker = copy.copy(checker)
+            checker.chunk_size = PACE_CHUNK_SIZE
+        objects_all = chain.from_iterable(
+            budget.gen_chunks(checker.gen_chunks(**model_plan.query_options))
+        )
+    else:
+        objects_all = checker.get_objects(**model_plan.query_options)
 
-    if not isinstance(exclude_validators, dict):
-        exclude_validators = dict(exclude_validators)
+    yield from _gen_python_consistency_errors(
+        model_plan, objects_all, stats, timings, queries, cache
+    )
 
-    for name, list_funcs in validators:
-        if name in exclude_validators:
-            exclude_funcs = exclude_validators[name]
-            list_funcs = list(set(list_funcs).difference(set(exclude_funcs)))
+    if model_plan.query_funcs and (budget is None or budget.check()):
+        yield from _gen_query_consistency_errors(
+            model_plan.cls, model_plan.query_funcs, objects, stats, checker, timings
+        )
 
-        if not list_funcs:
-            continue
 
-        app_label, model = name
-        cls_model = apps.get_model(app_label=app_label, model_name=model)
+def _gen_python_consistency_errors(
+    model_plan, objects, stats=None, timings=None, queries=None, cache=None
+) -> Generator[Tuple[str, Any, Any], None, None]:
+    """
+    generates inconsistency errors of python validators of @model_plan for @objects.
 
-        if objects_cls is not None and cls_model != objects_cls:
-            continue
+    the counters of the stats are collected locally and added to @stats at the end
+    """
+    # [func, validator_name, number of checks, number of errors]
+    counters = [
+        [func, validator_name, 0, 0]
+        for func, validator_name in zip(
+            model_plan.python_funcs, model_plan.python_names
+        )
+    ]
+    if not counters:
+        return
+
+    cache_session = None
+    if cache is not None:
+        cache_session = cache.session()
+        for counter in counters:
+            counter[0] = cache_session.wrap_validator(counter[0], counter[1])
+        objects = cache_session.gen_objects(objects)
+
+    if timings is not None:
+        for counter in counters:
+            counter[0] = timings.wrap_validator(counter[0], counter[1])
+        objects = timings.gen_counted_objects(model_plan.cls._meta.label, objects)
+
+    if queries is not None:
+        for counter in counters:
+            counter[0] = queries.wrap_validator(counter[0], counter[1])
+
+    # the errors collector is set for the whole loop
+    # and is reset only while the errors are yielded
+    errors: List[Tuple[Any, Optional[str]]] = []
+    token: Optional[Token] = _ERRORS.set(errors)
+    try:
+        for obj in objects:
+            for counter in counters:
+                exception = None
+                try:
+                    skip = counter[0](obj)
+                except Exception as e:
+                    # the check is counted twice for unhandled exceptions
+                    counter[2] += 2
+                    exception = e
+                else:
+                    if not skip:
+                        counter[2] += 1
+
+                if exception is None and not errors:
+                    continue
+
+                func_errors = errors[:]
+                del errors[:]
+                counter[3] += len(func_errors) + (exception is not None)
+
+                assert token is not None
+                _ERRORS.reset(token)
+                token = None
+                if exception is not None:
+                    yield (
+                        counter[1],
+                        obj,
+                        "{}:{}".format(exception.__class__, exception),
+                    )
+                for message, name in func_errors:
+                    if name:
+                        yield (counter[1] + "." + name, obj, message)
+                    else:
+                        yield (counter[1], obj, message)
+                token = _ERRORS.set(errors)
+    finally:
+        if token is not None:
+            _ERRORS.reset(token)
 
-        if objects_cls:
-            objects_all = objects
-        else:
-            objects_all = get_register_consistency(cls_model).get_objects()
-
-        for obj in objects_all:
-            for func in list_funcs:
-                with trace_consistency_errors() as errors:
-                    validator_name = "{}.{}.{}".format(app_label, model, func.__name__)
-                    check_stats_k = "check." + validator_name
-                    count_stats = True
-                    try:
-                        count_stats = not func(obj)
-                    except Exception as e:
-                        if stats is not None:
-                            stats_k = "ERR." + validator_name
-                            stats[stats_k] = stats.get(stats_k, 0) + 1
-                            stats[check_stats_k] = stats.get(check_stats_k, 0) + 1
-                        yield (
-                            validator_name,
-                            obj,
-                            "{}:{}".format(e.__class__, e),
-                        )
-                    finally:
-                        if count_stats and stats is not None:
-                            stats[check_stats_k] = stats.get(check_stats_k, 0) + 1
-                        for (message, name) in errors:
-                            if stats is not None:
-                                stats_k = "ERR." + validator_name
-                                stats[stats_k] = stats.get(stats_k, 0) + 1
-
-                            validator_name_message = validator_name
-                            if name:
-                                validator_name_message += "." + name
-                            yield (validator_name_message, obj, message)
-
-
-def monitoring_iteration(validators=None, exclude_validators=None) -> None:
+        if cache_session is not None:
+            cache_session.flush(stats)
+
+        if timings is not None:
+            for func, validator_name, checks, fails in counters:
+                timings.validators[validator_name].errors += fails
+
+        if stats is not None:
+            for func, validator_name, checks, fails in counters:
+                if checks:
+                    stats_k = "check." + validator_name
+                    stats[stats_k] = stats.get(stats_k, 0) + checks
+                if fails:
+                    stats_k = "ERR." + validator_name
+                    stats[stats_k] = stats.get(stats_k, 0) + fails
+
+
+def get_checkpoint_key(cls_model, list_funcs) -> Tuple[str, str, str]:
     """
-    One iteration of monitoring that checks consistency using @validators and @exclude_validators
-    and saves the result into ConsistencyFail model
+    key of the incremental monitoring checkpoint: (app, model, hash of validators)
     """
-    from .models import ConsistencyFail
+    names = sorted(func.__name__ for func in list_funcs)
+    validators_hash = hashlib.sha1(",".join(names).encode()).hexdigest()
+    return cls_model._meta.app_label, cls_model._meta.object_name, validators_hash
 
-    fail_ids = set()
 
-    for validator_name, obj, message in gen_consistency_errors(
-        validators,
-        exclude_validators=exclude_validators,
-    ):
-        fail = ConsistencyFail.objects.filter(
+def _gen_incremental_consistency_errors(
+    checker,
+    model_plan,
+    checkpoints,
+    stats=None,
+    timings=None,
+    queries=None,
+    budget=None,
+    cache=None,
+) -> Generator[Tuple[str, Any, Any], None, None]:
+    """
+    generates inconsistency errors for objects changed after the checkpoint
+    and moves the checkpoint to the last checked object
+    """
+    key = model_plan.checkpoint_key
+
+    query_options = dict(model_plan.query_options)
+    if "fields" in query_options or not model_plan.python_funcs:
+        query_options["fields"] = _merge_lookups(
+            query_options.get("fields", ()), [checker.incremental_field]
+        )
+
+    chunks = checker.gen_chunks(
+        incremental=True, checkpoint=checkpoints.get(key), **query_options
+    )
+    if budget is not None:
+        chunks = budget.gen_chunks(chunks)
+
+    for chunk in chunks:
+        yield from _gen_python_consistency_errors(
+            model_plan, chunk, stats, timings, queries, cache
+        )
+        if model_plan.query_funcs:
+            yield from _gen_query_consistency_errors(
+                checker.cls, model_plan.query_funcs, chunk, stats, timings=timings
+            )
+        checkpoints[key] = checker.get_checkpoint(chunk[-1])
+
+
+def _gen_resumable_consistency_errors(
+    checker,
+    model_plan,
+    cursors,
+    stats=None,
+    timings=None,
+    queries=None,
+    budget=None,
+    cache=None,
+) -> Generator[Tuple[str, Any, Any], None, None]:
+    """
+    generates inconsistency errors for objects after the cursor of the previous scan.
+    The cursor is moved after every chunk and removed when the scan is finished.
+    """
+    key = model_plan.checkpoint_key
+    pk_field = checker.cls._meta.pk
+    stats_prefixes = tuple(
+        "{}.{}.".format(kind, checker.cls._meta.label) for kind in ("check", "ERR")
+    )
+
+    query_options = dict(model_plan.query_options)
+    if not model_plan.python_funcs:
+        query_options["fields"] = ["pk"]
+
+    after_pk = None
+    cursor = cursors.get(key)
+    if cursor is not None:
+        after_pk = pk_field.to_python(cursor.object_id)
+        until_pk = (
+            pk_field.to_python(cursor.last_object_id) if cursor.last_object_id else None
+        )
+        if stats is not None:
+            for k, v in cursor.get_stats().items():
+                stats[k] = stats.get(k, 0) + v
+    else:
+        until_pk = checker.get_window_last_pk(**query_options)
+
+    if not checker.chunk_size or until_pk is not None:
+        checker = copy.copy(checker)
+        checker.chunk_size = checker.chunk_size or PACE_CHUNK_SIZE
+    if until_pk is not None:
+        # the window of limit objects is kept by until_pk,
+        # so the resumed scan doesn't go past it
+        checker.limit = None
+
+    chunks = checker.gen_chunks(after_pk=after_pk, until_pk=until_pk, **query_options)
+    if budget is not None:
+        chunks = budget.gen_chunks(chunks)
+
+    for chunk in chunks:
+        yield from _gen_python_consistency_errors(
+            model_plan, chunk, stats, timings, queries, cache
+        )
+        if model_plan.query_funcs:
+            yield from _gen_query_consistency_errors(
+                checker.cls, model_plan.query_funcs, chunk, stats, timings=timings
+            )
+        cursors.update(
+            key,
+            object_id=pk_field.value_to_string(chunk[-1]),
+            last_object_id="" if until_pk is None else str(until_pk),
+            stats={
+                k: v for k, v in (stats or {}).items() if k.startswith(stats_prefixes)
+            },
+        )
+
+    if budget is None or not budget.exhausted:
+        cursors.finish(key)
+
+
+def _gen_rolling_consistency_errors(
+    checker,
+    model_plan,
+    rolling,
+    stats=None,
+    timings=None,
+    queries=None,
+    budget=None,
+    cache=None,
+) -> Generator[Tuple[str, Any, Any], None, None]:
+    """
+    generates inconsistency errors for objects of the bucket of the rolling scan
+    after the last object checked by the previous run.
+    The position in the bucket is saved after every chunk.
+    """
+    key = model_plan.checkpoint_key
+    pk_field = checker.cls._meta.pk
+
+    query_options = dict(model_plan.query_options)
+    if not model_plan.python_funcs:
+        query_options["fields"] = ["pk"]
+
+    after_pk = None
+    position = rolling.get_position(key)
+    if position is not None:
+        after_pk = pk_field.to_python(position)
+
+    if not checker.chunk_size:
+        checker = copy.copy(checker)
+        checker.chunk_size = PACE_CHUNK_SIZE
+
+    chunks = checker.gen_chunks(after_pk=after_pk, **query_options)
+    if budget is not None:
+        chunks = budget.gen_chunks(chunks)
+
+    for chunk in chunks:
+        yield from _gen_python_consistency_errors(
+            model_plan, chunk, stats, timings, queries, cache
+        )
+        if model_plan.query_funcs:
+            yield from _gen_query_consistency_errors(
+                checker.cls, model_plan.query_funcs, chunk, stats, timings=timings
+            )
+        rolling.save_position(key, pk_field.value_to_string(chunk[-1]))
+
+
+def _gen_query_querysets(
+    cls_model, objects, checker=None
+) -> Generator[Tuple[QuerySet, Optional[int]], None, None]:
+    """
+    generates (queryset, number of objects or None if unknown) that together
+    cover @objects (or objects of @checker if None) for query validators
+    """
+    if isinstance(objects, QuerySet):
+        yield objects, None
+        return
+
+    if objects is not None:
+        pks = [obj.pk for obj in objects]
+    else:
+        if checker is None:
+            checker = get_register_consistency(cls_model)
+        queryset = checker.get_objects_queryset()
+        if checker.limit is None:
+            yield queryset, None
+            return
+        pks = list(queryset.values_list("pk", flat=True)[: checker.limit])
+
+    for i in range(0, len(pks), QUERY_VALIDATOR_BATCH_SIZE):
+        batch_pks = pks[i : i + QUERY_VALIDATOR_BATCH_SIZE]
+        yield cls_model._base_manager.filter(pk__in=batch_pks), len(batch_pks)
+
+
+def _gen_query_consistency_errors(
+    cls_model, query_funcs, objects=None, stats=None, checker=None, timings=None
+) -> Generator[Tuple[str, Any, Any], None, None]:
+    """
+    generates inconsistency errors of query validators.
+    Every validator is one query per batch of objects that selects inconsistent rows only.
+    """
+    objects_by_pk = {}
+    if objects is not None and not isinstance(objects, QuerySet):
+        objects_by_pk = {obj.pk: obj for obj in objects}
+
+    querysets = list(_gen_query_querysets(cls_model, objects, checker))
+    app_label, model = cls_model._meta.app_label, cls_model._meta.object_name
+    for func in query_funcs:
+        validator_name = "{}.{}.{}".format(app_label, model, func.__name__)
+        check_stats_k = "check." + validator_name
+        stats_k = "ERR." + validator_name
+        q = func(cls_model)
+        message = func.consistency_query_message
+
+        for queryset, count in querysets:
+            if count is None and (stats is not None or timings is not None):
+                count = queryset.count()
+            if stats is not None:
+                stats[check_stats_k] = stats.get(check_stats_k, 0) + count
+
+            queryset = queryset.select_related(None).prefetch_related(None)
+            queryset = queryset.filter(~q).only("pk")
+            if timings is not None:
+                wall, cpu = time.perf_counter(), thread_time()
+                queryset = list(queryset)
+                timing = timings.validators[validator_name]
+                timing.add(time.perf_counter() - wall, thread_time() - cpu, count)
+                timing.errors += len(queryset)
+
+            for obj in queryset:
+                if stats is not None:
+                    stats[stats_k] = stats.get(stats_k, 0) + 1
+                yield (validator_name, objects_by_pk.get(obj.pk, obj), message)
+
+
+def _save_consistency_fails(errors, batch_size) -> None:
+    """
+    saves one batch of errors generated by gen_consistency_errors.
+
+    new fails are created and changed fails are updated with one
+    INSERT ... ON CONFLICT query per batch where the backend supports it
+    (see _upsert_consistency_fails). Otherwise existing unresolved fails
+    are loaded with one query, new fails are created and changed fails are updated in bulk.
+    The backends without partial indexes (MySQL) have no unique index of unresolved
+    fails, there concurrent monitoring processes may create the same fail twice.
+    """
+    from django.contrib.contenttypes.models import ContentType
+    from django.db import connections, router
+    from django.utils import timezone
+
+    from .models import ConsistencyFail
+
+    # (content_type_id, object_id, validator_name) => message, the last message wins
+    messages = {}
+    for validator_name, obj, message in errors:
+        content_type = ContentType.objects.get_for_model(obj)
+        messages[(content_type.pk, str(obj.pk), validator_name)] = str(message)
+
+    connection = connections[router.db_for_write(ConsistencyFail)]
+    if _supports_fails_upsert(connection):
+        new_fails = _upsert_consistency_fails(connection, messages, batch_size)
+        _send_fails_created(new_fails, connection.alias)
+        return
+
+    existing_fails = {
+        (fail.content_type_id, fail.object_id, fail.validator_name): fail
+        for fail in ConsistencyFail.objects.filter(
             resolved=False,
-            validator_name=validator_name,
-            object_id=obj.id,
-        ).first()
-        if fail:
-            fail.update_message(message)
+            content_type_id__in={k[0] for k in messages.keys()},
+            object_id__in={k[1] for k in messages.keys()},
+            validator_name__in={k[2] for k in messages.keys()},
+        )
+    }
+
+    now = timezone.now()
+    new_fails = []
+    changed_fails = []
+    for key, message in messages.items():
+        fail = existing_fails.get(key)
+        if fail is None:
+            new_fails.append(
+                ConsistencyFail(
+                    content_type_id=key[0],
+                    object_id=key[1],
+                    validator_name=key[2],
+                    message=message,
+                )
+            )
+        elif fail.message != message:
+            fail.message = message
+            fail.updated_on = now
+            changed_fails.append(fail)
+
+    if new_fails:
+        if connection.features.supports_partial_indexes:
+            # a concurrent monitoring may have created the same fails,
+            # they are skipped by the unique index of unresolved fails
+            ConsistencyFail.objects.bulk_create(
+                new_fails, batch_size=batch_size, ignore_conflicts=True
+            )
         else:
-            fail = ConsistencyFail.objects.create(
-                validator_name=validator_name,
-                content_object=obj,
-                message=str(message),
+            # without partial indexes (MySQL) there is no unique index of unresolved
+            # fails, monitoring processes running at the same time may duplicate a fail
+            ConsistencyFail.objects.bulk_create(new_fails, batch_size=batch_size)
+        # the created fails are selected with their pks
+        new_fails = _select_created_fails(new_fails)
+        _send_fails_created(new_fails, connection.alias)
+    if changed_fails:
+        ConsistencyFail.objects.bulk_update(
+            changed_fails, ["message", "updated_on"], batch_size=batch_size
+        )
+
+
+def _send_fails_created(new_fails, using) -> None:
+    """
+    sends consistency_fails_created for the fails created in bulk.
+
+    post_save(created=True) is sent for every fail as well
+    (CONSISTENCY_MONITORING_POST_SAVE), as the fails used to be created one by one
+    """
+    from django.db.models.signals import post_save
+
+    from .models import ConsistencyFail
+    from .signals import consistency_fails_created
+
+    if not new_fails:
+        return
+    consistency_fails_created.send(sender=ConsistencyFail, fails=new_fails)
+    if MONITORING_POST_SAVE:
+        for fail in new_fails:
+            post_save.send(
+                sender=ConsistencyFail,
+                instance=fail,
+                created=True,
+                update_fields=None,
+                raw=False,
+                using=using,
             )
-        fail_ids.add(fail.id)
 
-    for fail in ConsistencyFail.objects.filter(resolved=False):
-        if fail.id in fail_ids:
-            continue
 
-        func_validators = gen_validators_by_func(fail.validator_name)
+def _select_created_fails(new_fails) -> List[Model]:
+    """
+    @new_fails saved by bulk_create(ignore_conflicts=True) that were inserted,
+    selected with their pks.
+
+    The fails skipped because a concurrent monitoring created them
+    have a different created_on.
+    """
+    from .models import ConsistencyFail
+
+    created_on = {
+        (fail.content_type_id, fail.object_id, fail.validator_name): fail.created_on
+        for fail in new_fails
+    }
+    fails = ConsistencyFail.objects.filter(
+        resolved=False,
+        content_type_id__in={k[0] for k in created_on},
+        object_id__in={k[1] for k in created_on},
+        validator_name__in={k[2] for k in created_on},
+    ).order_by("pk")
+    return [
+        fail
+        for fail in fails
+        if created_on.get((fail.content_type_id, fail.object_id, fail.validator_name))
+        == fail.created_on
+    ]
+
+
+def _supports_fails_upsert(connection) -> bool:
+    """
+    INSERT ... ON CONFLICT with a partial unique index and RETURNING
+    """
+    if connection.vendor == "postgresql":
+        return True
+    if connection.vendor == "sqlite":
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+def _upsert_consistency_fails(connection, messages, batch_size) -> List[Model]:
+    """
+    creates new unresolved fails and updates messages of the existing ones
+    with INSERT ... ON CONFLICT on "consistency_fail_unresolved" unique index,
+    so concurrent monitoring processes never create the same fail twice.
+
+    @messages - (content_type_id, object_id, validator_name) => message
+
+    returns the created fails
+    """
+    from django.utils import timezone
+
+    from .models import ConsistencyFail
+
+    meta = ConsistencyFail._meta
+    qn = connection.ops.quote_name
+    columns = {
+        name: qn(meta.get_field(name).column)
+        for name in (
+            "created_on",
+            "updated_on",
+            "content_type",
+            "object_id",
+            "validator_name",
+            "message",
+            "resolved",
+        )
+    }
+    table = qn(meta.db_table)
+    if connection.vendor == "sqlite":
+        # the partial index is matched by SQLite only when the condition is
+        # the same expression as in the index, the last ON CONFLICT clause
+        # without a target handles conflicts with any unique index instead
+        conflict_target = ""
+    else:
+        conflict_target = "({}, {}, {}) WHERE {}".format(
+            columns["content_type"],
+            columns["object_id"],
+            columns["validator_name"],
+            ConsistencyFail.get_unresolved_condition_sql(qn),
+        )
+
+    now = meta.get_field("created_on").get_db_prep_value(timezone.now(), connection)
+    rows = [
+        (now, now, key[0], key[1], key[2], message, False)
+        for key, message in messages.items()
+    ]
+    batch_size = min(batch_size, connection.ops.bulk_batch_size(list(columns), rows))
+
+    sql = (
+        "INSERT INTO {table} ({columns}) VALUES {{values}} "
+        "ON CONFLICT {conflict_target} "
+        "DO UPDATE SET {message} = EXCLUDED.{message}, "
+        "{updated_on} = EXCLUDED.{updated_on} "
+        "WHERE {table}.{message} <> EXCLUDED.{message} "
+        # the created fails have the same created_on and updated_on
+        "RETURNING {pk}, {content_type}, {object_id}, {validator_name}, "
+        "{created_on} = {updated_on}"
+    ).format(
+        table=table,
+        columns=", ".join(columns.values()),
+        conflict_target=conflict_target,
+        pk=qn(meta.pk.column),
+        **columns,
+    )
+    placeholder = "({})".format(", ".join(["%s"] * len(columns)))
+
+    new_fails = []
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i : i + batch_size]
+            cursor.execute(
+                sql.format(values=", ".join([placeholder] * len(batch))),
+                [value for row in batch for value in row],
+            )
+            for (
+                pk,
+                content_type_id,
+                object_id,
+                validator_name,
+                created,
+            ) in cursor.fetchall():
+                if not created:
+                    continue
+                new_fails.append(
+                    ConsistencyFail(
+                        pk=pk,
+                        content_type_id=content_type_id,
+                        object_id=object_id,
+                        validator_name=validator_name,
+                        message=messages[(content_type_id, object_id, validator_name)],
+                    )
+                )
+    return new_fails
+
+
+def _recheck_consistency_fails(fails, model, func_plan, batch_size) -> None:
+    """
+    checks again one batch of unresolved fails of the same model and validator function.
+
+    objects are loaded with one query, fails that are not reproduced anymore
+    (or their objects are deleted) are resolved in bulk.
+    """
+    from django.utils import timezone
+
+    from .models import ConsistencyFail
+
+    if not fails:
+        return
+
+    objects = {}
+    if model is not None and func_plan.models:
+        pk_field = model._meta.pk
+        objects = model._base_manager.in_bulk(
+            {pk_field.to_python(fail.object_id) for fail in fails}
+        )
+
+    messages = {}
+    if objects:
         for validator_name, obj, message in gen_consistency_errors(
-            func_validators, objects=[fail.content_object]
+            func_plan, objects=list(objects.values())
         ):
-            if fail.validator_name == validator_name:
-                fail.update_message(message)
+            messages[(validator_name, str(obj.pk))] = str(message)
+
+    now = timezone.now()
+    resolved_ids = []
+    changed_fails = []
+    for fail in fails:
+        message = messages.get((fail.validator_name, fail.object_id))
+        if message is None:
+            resolved_ids.append(fail.pk)
+        elif fail.message != message:
+            fail.message = message
+            fail.updated_on = now
+            changed_fails.append(fail)
+
+    if resolved_ids:
+        ConsistencyFail.objects.filter(pk__in=resolved_ids).update(
+            resolved=True, resolved_on=now
+        )
+    if changed_fails:
+        ConsistencyFail.objects.bulk_update(
+            changed_fails, ["message", "updated_on"], batch_size=batch_size
+        )
+
+
+def _load_checkpoints() -> Dict[Tuple[str, str, str], Tuple[str, str]]:
+    """
+    checkpoints of incremental monitoring saved in ConsistencyCheckpoint
+    """
+    from .models import ConsistencyCheckpoint
+
+    checkpoints = {}
+    for checkpoint in ConsistencyCheckpoint.objects.select_related("content_type"):
+        model = checkpoint.content_type.model_class()
+        if model is None:
+            continue
+        key = (
+            model._meta.app_label,
+            model._meta.object_name,
+            checkpoint.validators_hash,
+        )
+        checkpoints[key] = (checkpoint.value, checkpoint.object_id)
+    return checkpoints
+
+
+def _save_checkpoints(checkpoints, prev_checkpoints) -> None:
+    """
+    saves changed checkpoints of incremental monitoring into ConsistencyCheckpoint
+    """
+    from django.contrib.contenttypes.models import ContentType
+
+    from .models import ConsistencyCheckpoint
+
+    for key, (value, object_id) in checkpoints.items():
+        if prev_checkpoints.get(key) == (value, object_id):
+            continue
+        app_label, model, validators_hash = key
+        ConsistencyCheckpoint.objects.update_or_create(
+            content_type=ContentType.objects.get_for_model(
+                apps.get_model(app_label=app_label, model_name=model)
+            ),
+            validators_hash=validators_hash,
+            defaults={"value": value, "object_id": object_id},
+        )
+
+
+class ScanCursors:
+    """
+    cursors of resumable scans saved in ConsistencyScanCursor
+    (see gen_consistency_errors @cursors).
+
+    @name - name of the scan, every scan has its own cursors
+    @before_save - function that is called before a cursor is saved,
+    e.g. to save the errors found before the cursor
+    """
+
+    def __init__(self, name: str, before_save: Optional[Callable] = None) -> None:
+        from .models import ConsistencyScanCursor
+
+        self.name = name
+        self.before_save = before_save
+        # (app_label, model, validators_hash) => ConsistencyScanCursor
+        self.cursors: Dict[Tuple[str, str, str], ConsistencyScanCursor] = {}
+        for cursor in ConsistencyScanCursor.objects.filter(name=name).select_related(
+            "content_type"
+        ):
+            model = cursor.content_type.model_class()
+            if model is None:
+                continue
+            key = (
+                model._meta.app_label,
+                model._meta.object_name,
+                cursor.validators_hash,
+            )
+            self.cursors[key] = cursor
+
+    def get(self, key) -> Optional["ConsistencyScanCursor"]:
+        return self.cursors.get(key)
+
+    def _get_lookup(self, key) -> Dict[str, Any]:
+        from django.contrib.contenttypes.models import ContentType
+
+        app_label, model, validators_hash = key
+        return {
+            "name": self.name,
+            "content_type": ContentType.objects.get_for_model(
+                apps.get_model(app_label=app_label, model_name=model)
+            ),
+            "validators_hash": validators_hash,
+        }
+
+    def update(self, key, stats: Optional[Dict[str, int]] = None, **values) -> None:
+        """
+        saves the fields of the cursor (see ConsistencyScanCursor):
+        the last checked pk, the stats of the scan, etc
+        """
+        from .models import ConsistencyScanCursor
+
+        if self.before_save is not None:
+            self.before_save()
+        if stats is not None:
+            values["stats"] = json.dumps(stats)
+        self.cursors[key], _ = ConsistencyScanCursor.objects.update_or_create(
+            defaults=values, **self._get_lookup(key)
+        )
+
+    def finish(self, key) -> None:
+        """
+        removes the cursor of the finished scan, the next scan starts from the beginning
+        """
+        from .models import ConsistencyScanCursor
+
+        if self.cursors.pop(key, None) is not None:
+            ConsistencyScanCursor.objects.filter(**self._get_lookup(key)).delete()
+
+
+class RollingScan:
+    """
+    rolling scans of the models with checker.rolling_buckets
+    (see gen_consistency_errors @rolling). Every run checks the next bucket of the model,
+    the plans and the last checked object of the bucket are saved in ConsistencyScanCursor,
+    so a bucket that wasn't finished by a run is continued by the next one.
+
+    @before_save - see ScanCursors
+    """
+
+    def __init__(self, before_save: Optional[Callable] = None) -> None:
+        self.before_save = before_save
+        self._cursors: Optional[ScanCursors] = None
+        # "app.Model" => plan of the bucket checked by this run
+        self.plans: Dict[str, Dict[str, Optional[int]]] = {}
+        # (app_label, model, validators_hash) => plan of the bucket in progress
+        self._pending: Dict[Tuple[str, str, str], Dict[str, int]] = {}
+        # (app_label, model, validators_hash) => last checked pk of the bucket in progress
+        self._positions: Dict[Tuple[str, str, str], str] = {}
+
+    @property
+    def cursors(self) -> ScanCursors:
+        # the cursors are loaded only if a model has a rolling scan
+        if self._cursors is None:
+            self._cursors = ScanCursors("rolling", before_save=self.before_save)
+        return self._cursors
+
+    def get_checker(self, checker, key):
+        """
+        copy of @checker that checks the next bucket
+        """
+        cursor = self.cursors.get(key)
+        prev_plan = None
+        if cursor is not None and cursor.bucket is not None:
+            prev_plan = {
+                "bucket": cursor.bucket,
+                "buckets": cursor.buckets,
+                "first": cursor.range_first,
+                "width": cursor.bucket_width,
+            }
+        shard, plan = checker.get_rolling_shard(prev_plan)
+        if shard is None:
+            return checker
+        if plan is not None:
+            self._pending[key] = plan
+            if cursor is not None and cursor.object_id and plan == prev_plan:
+                self._positions[key] = cursor.object_id
+            self.plans[checker.cls._meta.label] = dict(
+                plan, first_pk=shard[1], last_pk=shard[2]
+            )
+        return checker.get_shard(shard)
+
+    def has_bucket(self, key) -> bool:
+        """
+        True if the model is checked by a bucket of its rolling scan
+        """
+        return key in self._pending
+
+    def get_position(self, key) -> Optional[str]:
+        """
+        last checked pk of the bucket saved by the previous run, None from the beginning
+        """
+        return self._positions.get(key)
+
+    def save_position(self, key, object_id: str) -> None:
+        """
+        saves the last checked pk of the bucket in progress
+        """
+        self._positions[key] = object_id
+        self._save(key, self._pending[key], object_id)
+
+    def finish_bucket(self, key) -> None:
+        """
+        moves the scan of the model to the next bucket
+        """
+        plan = self._pending.pop(key, None)
+        self._positions.pop(key, None)
+        if plan is None:
+            return
+        self._save(key, dict(plan, bucket=plan["bucket"] + 1), "")
+
+    def _save(self, key, plan: Dict[str, int], object_id: str) -> None:
+        self.cursors.update(
+            key,
+            object_id=object_id,
+            bucket=plan["bucket"],
+            buckets=plan["buckets"],
+            range_first=plan["first"],
+            bucket_width=plan["width"],
+        )
+
+    def format_plans(self) -> str:
+        return "\n".join(
+            "{}: bucket {}/{} pk {}-{}".format(
+                label,
+                (plan["bucket"] or 0) + 1,
+                plan["buckets"],
+                plan["first_pk"],
+                "" if plan["last_pk"] is None else plan["last_pk"],
+            )
+            for label, plan in sorted(self.plans.items())
+        )
+
+
+def monitoring_iteration(
+    validators=None,
+    exclude_validators=None,
+    batch_size=None,
+    workers=None,
+    profile=None,
+    max_seconds=None,
+    max_rows_per_second=None,
+    resume=False,
+    rolling=None,
+    stop_event=None,
+) -> None:
+    """
+    One iteration of monitoring that checks consistency using @validators and @exclude_validators
+    and saves the result into ConsistencyFail model
+
+    Models with checker.incremental_field are checked from the checkpoint
+    saved by the previous iteration (ConsistencyCheckpoint)
+
+    @batch_size - how many errors are saved (or unresolved fails are checked again) at once
+    (CONSISTENCY_MONITORING_BATCH_SIZE by default)
+
+    @workers - number of processes that check objects (see gen_consistency_errors_in_workers).
+    None - objects are checked in the current process. The models with rolling_buckets
+    can't be checked by workers
+
+    @profile - ValidationProfile for profiling every model separately (without @workers)
+
+    @max_seconds - the iteration stops between chunks of objects when the time is over
+    (CONSISTENCY_MONITORING_MAX_SECONDS by default). The fails that were not checked again
+    stay unresolved.
+
+    @max_rows_per_second - the scan and the recheck of the fails are paced to check
+    not more rows per second (CONSISTENCY_MONITORING_MAX_ROWS_PER_SECOND by default)
+
+    The budget can't be set with @workers and the budget of the settings is not used by them
+
+    @stop_event - threading.Event, the iteration stops between chunks of objects
+    when the event is set, the same way as when the time is over (without @workers)
+
+    @resume - the models ordered by pk are checked from the cursor saved by the previous
+    iteration (ConsistencyScanCursor), so a long scan continues after a restart
+
+    @rolling - RollingScan for the models with checker.rolling_buckets
+    (a new one by default), its plans describe the buckets checked by the iteration
+
+    Passed checks are cached in CONSISTENCY_RESULT_CACHE_PATH if it is set
+    (see ValidationCache), without @workers only
+    """
+    from django.contrib.contenttypes.models import ContentType
+
+    from .models import ConsistencyFail
+
+    if batch_size is None:
+        batch_size = MONITORING_BATCH_SIZE
+    if workers:
+        # the budget of the settings doesn't apply to the workers
+        if (
+            max_seconds is not None
+            or max_rows_per_second is not None
+            or stop_event is not None
+        ):
+            raise ValueError(
+                "max_seconds, max_rows_per_second and stop_event can't be used with workers"
+            )
+    else:
+        if max_seconds is None:
+            max_seconds = MONITORING_MAX_SECONDS
+        if max_rows_per_second is None:
+            max_rows_per_second = MONITORING_MAX_ROWS_PER_SECOND
+
+    budget = None
+    if (
+        max_seconds is not None
+        or max_rows_per_second is not None
+        or stop_event is not None
+    ):
+        budget = ScanBudget(max_seconds, max_rows_per_second, stop_event)
+
+    unresolved_fails = ConsistencyFail.objects.filter(resolved=False)
+    if validators is not None or exclude_validators is not None:
+        validators = ValidationPlan(validators, exclude_validators=exclude_validators)
+        exclude_validators = None
+        # recheck only fails of the validators that are in use
+        unresolved_fails = unresolved_fails.filter(_validator_names_q(validators))
+
+    # (validator_name, object_id) of all of the fails found by this iteration
+    fail_keys = set()
+
+    prev_checkpoints = _load_checkpoints()
+    checkpoints = dict(prev_checkpoints)
+
+    errors: List[Tuple[str, Any, Any]] = []
+    cache = None
+
+    def save_errors():
+        if errors:
+            _save_consistency_fails(errors, batch_size)
+            errors.clear()
+
+    if workers:
+        from .parallel import gen_consistency_errors_in_workers
+
+        assert not resume, "resume can't be used with workers"
+        if not isinstance(validators, ValidationPlan):
+            validators = ValidationPlan(validators)
+        assert (
+            not validators.get_rolling_labels()
+        ), "rolling_buckets can't be used with workers"
+        gen_errors = partial(gen_consistency_errors_in_workers, workers)
+    else:
+        # the errors found before a cursor are saved before the cursor
+        cursors = ScanCursors("monitoring", before_save=save_errors) if resume else None
+        if rolling is None:
+            rolling = RollingScan()
+        rolling.before_save = save_errors
+        if RESULT_CACHE_PATH:
+            from .cache import ResultCache, ValidationCache
+
+            cache = ValidationCache(ResultCache(RESULT_CACHE_PATH))
+        gen_errors = partial(
+            gen_consistency_errors,
+            profile=profile,
+            budget=budget,
+            cursors=cursors,
+            rolling=rolling,
+            cache=cache,
+        )
+
+    try:
+        for validator_name, obj, message in gen_errors(
+            validators,
+            exclude_validators=exclude_validators,
+            checkpoints=checkpoints,
+        ):
+            errors.append((validator_name, obj, message))
+            fail_keys.add((validator_name, str(obj.pk)))
+            if len(errors) >= batch_size:
+                save_errors()
+    finally:
+        if cache is not None:
+            cache.close()
+
+    save_errors()
+
+    # the checkpoints are saved when all of the errors before them are saved
+    _save_checkpoints(checkpoints, prev_checkpoints)
+
+    # (content_type_id, validator function name "app.Model.func") => {validator_name}
+    fail_groups = defaultdict(set)
+    for content_type_id, validator_name in unresolved_fails.values_list(
+        "content_type_id", "validator_name"
+    ).distinct():
+        func_name = ".".join(validator_name.split(".")[:3])
+        fail_groups[(content_type_id, func_name)].add(validator_name)
+
+    for (content_type_id, func_name), validator_names in fail_groups.items():
+        fails = ConsistencyFail.objects.filter(
+            resolved=False,
+            content_type_id=content_type_id,
+            validator_name__in=validator_names,
+        ).order_by("pk")
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        func_plan = ValidationPlan(gen_validators_by_func(func_name))
+
+        last_pk = None
+        while budget is None or budget.check():
+            fails_chunk = fails if last_pk is None else fails.filter(pk__gt=last_pk)
+            fails_chunk = list(fails_chunk[:batch_size])
+            if not fails_chunk:
                 break
-        else:
-            fail.resolve()
+            last_pk = fails_chunk[-1].pk
+            fails_chunk = [
+                fail
+                for fail in fails_chunk
+                if (fail.validator_name, fail.object_id) not in fail_keys
+            ]
+            _recheck_consistency_fails(fails_chunk, model, func_plan, batch_size)
+            if budget is not None:
+                budget.pace(len(fails_chunk))
@@ -0,0 +1,166 @@
+"""
+Benchmarks of gen_consistency_errors and monitoring_iteration on synthetic data.
+
+They are not collected by the default test run, run them explicitly:
+
+    python -m pytest tests/benchmarks.py -s
+
+CONSISTENCY_BENCH_ROWS - comma separated table sizes (10000 by default),
+for example "10000,100000,1000000"
+
+CONSISTENCY_BENCH_OUTPUT - file the results are appended to as JSON lines
+(consistency_bench_output.txt in the temp directory by default)
+"""
+
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from decimal import Decimal
+from itertools import islice
+from typing import Generator, Tuple
+
+import django
+from django.db.models import F
+from django.test import TestCase
+from tests.models import Order
+
+from consistency_model import (
+    ConsistencyChecker,
+    gen_consistency_errors,
+    gen_validators_by_model,
+    monitoring_iteration,
+)
+from consistency_model.models import ConsistencyFail
+from consistency_model.tools import CONSISTENCY_CHECKERS
+
+BENCH_ROWS = [
+    int(rows)
+    for rows in os.environ.get("CONSISTENCY_BENCH_ROWS", "10000").split(",")
+    if rows.strip()
+]
+BENCH_OUTPUT = os.environ.get(
+    "CONSISTENCY_BENCH_OUTPUT",
+    os.path.join(tempfile.gettempdir(), "consistency_bench_output.txt"),
+)
+BENCH_CHUNK_SIZE = 10_000
+
+# half of the rows are broken in error-heavy benchmarks
+ERROR_RATE = 0.5
+
+
+def gen_orders(count: int, error_rate: float = 0.0) -> Generator[Order, None, None]:
+    """
+    generates not saved orders, every 1/@error_rate order has a wrong revenue
+    """
+    step = round(1 / error_rate) if error_rate else 0
+    for i in range(count):
+        total = Decimal(10 + i % 90)
+        refund = Decimal(i % 5)
+        revenue = total - refund
+        if step and i % step == 0:
+            revenue += 1
+        yield Order(total=total, refund=refund, revenue=revenue)
+
+
+def create_orders(count: int, error_rate: float = 0.0, batch_size: int = 10_000):
+    Order.objects.all().delete()
+    orders = gen_orders(count, error_rate)
+    while True:
+        batch = list(islice(orders, batch_size))
+        if not batch:
+            break
+        Order.objects.bulk_create(batch, batch_size=batch_size)
+
+
+def get_commit() -> str:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+class OrderBenchmarks(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.commit = get_commit()
+
+    def setUp(self) -> None:
+        self.prev_checker = CONSISTENCY_CHECKERS.get(Order)
+        CONSISTENCY_CHECKERS[Order] = ConsistencyChecker(
+            Order, limit=None, chunk_size=BENCH_CHUNK_SIZE
+        )
+
+    def tearDown(self) -> None:
+        if self.prev_checker is None:
+            del CONSISTENCY_CHECKERS[Order]
+        else:
+            CONSISTENCY_CHECKERS[Order] = self.prev_checker
+
+    def record(self, benchmark: str, rows: int, errors: int, seconds: float):
+        result = {
+            "benchmark": benchmark,
+            "rows": rows,
+            "errors": errors,
+            "seconds": round(seconds, 6),
+            "rows_per_second": round(rows / seconds) if seconds else None,
+            "commit": self.commit,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+        }
+        print(json.dumps(result))
+        with open(BENCH_OUTPUT, "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+    def scan(self) -> Tuple[int, float]:
+        start = time.perf_counter()
+        errors = sum(1 for _ in gen_consistency_errors(create_validators="tests.Order"))
+        return errors, time.perf_counter() - start
+
+    def test_scan(self):
+        for rows in BENCH_ROWS:
+            create_orders(rows)
+            errors, seconds = self.scan()
+            self.assertEqual(errors, 0)
+            self.record("scan", rows, errors, seconds)
+
+    def test_scan_errors(self):
+        for rows in BENCH_ROWS:
+            create_orders(rows, ERROR_RATE)
+            errors, seconds = self.scan()
+            self.assertEqual(errors, round(rows * ERROR_RATE))
+            self.record("scan_errors", rows, errors, seconds)
+
+    def test_monitoring(self):
+        validators = list(gen_validators_by_model("tests.Order"))
+        for rows in BENCH_ROWS:
+            ConsistencyFail.objects.all().delete()
+            create_orders(rows, ERROR_RATE)
+            errors = round(rows * ERROR_RATE)
+
+            # all of the fails are new
+            start = time.perf_counter()
+            monitoring_iteration(validators)
+            self.record("monitoring_create", rows, errors, time.perf_counter() - start)
+            self.assertEqual(ConsistencyFail.objects.count(), errors)
+
+            # all of the fails already exist
+            start = time.perf_counter()
+            monitoring_iteration(validators)
+            self.record("monitoring_update", rows, errors, time.perf_counter() - start)
+
+            # all of the fails are resolved
+            Order.objects.update(revenue=F("total") - F("refund"))
+            start = time.perf_counter()
+            monitoring_iteration(validators)
+            self.record("monitoring_resolve", rows, errors, time.perf_counter() - start)
+            self.assertFalse(ConsistencyFail.objects.filter(resolved=False).exists())
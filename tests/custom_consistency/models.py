@@ -2,7 +2,9 @@ from django.db import models
 from django.utils import timezone
 
 from consistency_model import (
+    consistency_error,
     consistency_validator,
+    consistency_query_validator,
     register_consistency,
     ConsistencyChecker,
 )
@@ -35,3 +37,47 @@ class OrderWithSkipCheckConsistency(ConsistencyChecker):
     def get_queryset(self):
         queryset = super().get_queryset()
         return queryset.exclude(skip_consistency_check=True)
+
+
+class OrderWithQueryCheck(models.Model):
+    total = models.IntegerField(default=0)
+    refund = models.IntegerField(default=0)
+    revenue = models.IntegerField(default=0)
+
+    @consistency_validator
+    def validate_total(self):
+        assert self.total >= 0, "can't be negative"
+
+    @consistency_query_validator(message="revenue = total - refund")
+    def validate_revenue(cls):
+        return models.Q(revenue=models.F("total") - models.F("refund"))
+
+
+@register_consistency(limit=2, incremental_field="modified_on")
+class OrderWithIncrementalCheck(models.Model):
+    modified_on = models.DateTimeField(auto_now=True)
+    name = models.CharField(max_length=100)
+    total_items = models.IntegerField(default=0)
+
+    @consistency_validator
+    def validate_total_items(self):
+        assert self.total_items >= 0, "can't be negative"
+
+
+class OrderWithFields(models.Model):
+    created_on = models.DateTimeField(default=timezone.now)
+    total = models.IntegerField(default=0)
+    refund = models.IntegerField(default=0)
+    revenue = models.IntegerField(default=0)
+
+    @consistency_validator(fields=["total"])
+    def validate_total(self):
+        assert self.total >= 0, "can't be negative"
+
+    @consistency_validator(fields=["total", "refund", "revenue"])
+    def validate_revenue(self):
+        if self.revenue < 0:
+            consistency_error("can't be negative", "negative")
+
+        if self.revenue != self.total - self.refund:
+            consistency_error("revenue = total - refund", "formula")
@@ -0,0 +1,57 @@
+"""
+runs consistency_model_check serially and with a pool of worker processes
+on a file-backed sqlite DB (the workers can't share the in-memory DB of the tests)
+and prints the outputs as JSON. Used by tests.test_commands.TestWorkersPool.
+
+usage: python -m tests.run_workers DB_PATH
+"""
+
+import json
+import sys
+from io import StringIO
+
+import django
+
+
+def call_command_output(*args):
+    from django.core.management import call_command
+
+    out = StringIO()
+    err = StringIO()
+    call_command(*args, stdout=out, stderr=err)
+    return {"stats": sorted(out.getvalue().splitlines()), "errors": err.getvalue()}
+
+
+def main(db_path):
+    from django.conf import settings
+
+    from tests.conftest import pytest_configure
+
+    pytest_configure(None)
+    settings.DATABASES["default"]["NAME"] = db_path
+    django.setup()
+
+    from django.core.management import call_command
+
+    from tests.custom_consistency.models import OrderWithQueryCheck
+    from tests.models import Order
+
+    call_command("migrate", run_syncdb=True, verbosity=0)
+    for i in range(20):
+        Order.objects.create(total=i - 10, refund=0, revenue=i - 10)
+        OrderWithQueryCheck.objects.create(total=i - 5, refund=0, revenue=i % 2)
+
+    validators = ["tests.Order", "custom_consistency.OrderWithQueryCheck"]
+    result = {
+        "serial": call_command_output(
+            "consistency_model_check", "--filter", *validators
+        ),
+        "workers": call_command_output(
+            "consistency_model_check", "--workers", "2", "--filter", *validators
+        ),
+    }
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1])
@@ -0,0 +1,93 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from tests.models import Order
+from tests.subapp.models import Store
+
+from consistency_model.admin import EstimatedCountPaginator
+from consistency_model.models import ConsistencyFail
+
+
+class TestConsistencyFailAdmin(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(user)
+
+    def create_fails(self, model, validator_name, count):
+        content_type = ContentType.objects.get_for_model(model)
+        for _ in range(count):
+            obj = (
+                Order.objects.create(total=-5, refund=0, revenue=-5)
+                if model is Order
+                else Store.objects.create(name="tools", total_items=-1)
+            )
+            ConsistencyFail.objects.create(
+                validator_name=validator_name,
+                content_type=content_type,
+                object_id=str(obj.pk),
+                message="fail",
+            )
+
+    def get_changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("admin:consistency_model_consistencyfail_changelist")
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_content_objects(self):
+        self.create_fails(Order, "tests.Order.validate_total", 2)
+        self.create_fails(Store, "subapp.Store.validate_total_items", 1)
+        queries = self.get_changelist_queries()
+
+        self.create_fails(Order, "tests.Order.validate_total", 3)
+        self.create_fails(Store, "subapp.Store.validate_total_items", 3)
+        # one query per model, not per fail
+        self.assertEqual(self.get_changelist_queries(), queries)
+
+    def test_summary(self):
+        self.create_fails(Order, "tests.Order.validate_total", 3)
+        self.create_fails(Store, "subapp.Store.validate_total_items", 1)
+        ConsistencyFail.objects.filter(pk=ConsistencyFail.objects.first().pk).update(
+            resolved=True
+        )
+        url = reverse("admin:consistency_model_consistencyfail_summary")
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["total"], 3)
+        self.assertEqual(
+            response.context["by_validator"],
+            [
+                {"validator_name": "tests.Order.validate_total", "count": 2},
+                {"validator_name": "subapp.Store.validate_total_items", "count": 1},
+            ],
+        )
+        self.assertContains(response, "tests.order")
+
+        # the summary is cached
+        self.create_fails(Order, "tests.Order.validate_total", 1)
+        response = self.client.get(url)
+        self.assertEqual(response.context["total"], 3)
+
+    def test_estimated_count(self):
+        self.create_fails(Order, "tests.Order.validate_total", 3)
+        paginator = EstimatedCountPaginator(ConsistencyFail.objects.order_by("pk"), 100)
+        self.assertEqual(paginator.count, 3)
+
+        with mock.patch(
+            "consistency_model.admin.get_estimated_count", return_value=1_000_000
+        ):
+            paginator = EstimatedCountPaginator(
+                ConsistencyFail.objects.order_by("pk"), 100
+            )
+            self.assertEqual(paginator.count, 1_000_000)
+            self.assertEqual(paginator.num_pages, 10_000)
@@ -1,11 +1,18 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from django.test import TestCase
 from tests.models import Order
 from tests.subapp.models import Store
 
 from consistency_model import (
+    ValidationPlan,
+    ValidationTimings,
+    ValidationQueries,
     gen_consistency_errors,
     gen_validators_by_model,
     gen_validators_by_func,
+    consistency_error,
 )
 
 
@@ -175,6 +182,105 @@ class TestOrderValidators(TestCase):
             [],
         )
 
+    def test_plan(self):
+        last_order = Order.objects.all().last()
+        last_order.total = -100
+        last_order.save()
+
+        plan = ValidationPlan(
+            create_validators="tests.Order",
+            create_exclude_validators="tests.Order.validate_revenue",
+        )
+        self.assertEqual(
+            [(m.cls, m.python_names) for m in plan.models],
+            [(Order, ["tests.Order.validate_total"])],
+        )
+
+        for i in range(2):
+            stats = {}
+            self.assertEqualErrors(
+                gen_consistency_errors(plan, stats=stats),
+                [
+                    (
+                        "tests.Order.validate_total",
+                        last_order.pk,
+                        "<class 'AssertionError'>:can't be negative",
+                    ),
+                ],
+            )
+            self.assertEqual(stats["ERR.tests.Order.validate_total"], 1)
+
+    def test_timings(self):
+        last_order = Order.objects.all().last()
+        last_order.revenue = -100
+        last_order.save()
+
+        timings = ValidationTimings()
+        errors = list(
+            gen_consistency_errors(create_validators="tests.Order", timings=timings)
+        )
+        self.assertEqual(len(errors), 2)
+
+        report = {(row["kind"], row["name"]): row for row in timings.report()}
+        self.assertEqual(
+            set(report.keys()),
+            {
+                ("model", "tests.Order"),
+                ("validator", "tests.Order.validate_total"),
+                ("validator", "tests.Order.validate_revenue"),
+            },
+        )
+        self.assertEqual(report[("model", "tests.Order")]["count"], 3)
+        self.assertEqual(report[("model", "tests.Order")]["errors"], 2)
+        row = report[("validator", "tests.Order.validate_revenue")]
+        self.assertEqual((row["count"], row["errors"]), (3, 2))
+        self.assertTrue(0 < row["p50"] <= row["p95"] <= row["p99"])
+
+    def test_queries(self):
+        def validate_items(obj):
+            obj.orderitem_set.count()
+
+        queries = ValidationQueries()
+        validators = [
+            (("tests", "Order"), [validate_items, Order.validate_total]),
+        ]
+        with self.assertNumQueries(4):
+            errors = list(gen_consistency_errors(validators, queries=queries))
+        self.assertEqual(errors, [])
+
+        report = {row["name"]: row for row in queries.report()}
+        row = report["tests.Order.validate_items"]
+        self.assertEqual((row["count"], row["queries"]), (3, 3))
+        self.assertTrue(row["n_plus_one"])
+        row = report["tests.Order.validate_total"]
+        self.assertEqual((row["count"], row["queries"]), (3, 0))
+        self.assertFalse(row["n_plus_one"])
+
+    def test_errors_in_threads(self):
+        def validate_pk(obj):
+            consistency_error(obj.pk, "first")
+            time.sleep(0.001)
+            consistency_error(obj.pk, "second")
+
+        def check(pk):
+            return list(
+                gen_consistency_errors(
+                    {("tests", "Order"): [validate_pk]}, objects=[Order(pk=pk)]
+                )
+            )
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(check, range(1, 41)))
+
+        for pk, errors in zip(range(1, 41), results):
+            self.assertEqual(
+                [(name, message) for name, obj, message in errors],
+                [
+                    ("tests.Order.validate_pk.first", pk),
+                    ("tests.Order.validate_pk.second", pk),
+                ],
+            )
+
 
 class TestSubAppStorage(TestCase):
     def setUp(self) -> None:
@@ -0,0 +1,128 @@
+import os
+import tempfile
+
+from django.test import TestCase
+from tests.custom_consistency.models import OrderWithFields
+from tests.models import Order
+
+from consistency_model import gen_consistency_errors, gen_validators_by_model
+from consistency_model.cache import ResultCache, ValidationCache, get_validator_version
+
+
+class TestResultCache(TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.sqlite3")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_unchanged(self):
+        cache = ResultCache(self.path)
+        cache.add("v", [(1, b"a"), (2, b"b")])
+        self.assertEqual(cache.get_unchanged("v", {1: b"a", 2: b"x", 3: b"c"}), {1})
+        self.assertEqual(cache.get_unchanged("other", {1: b"a"}), set())
+        cache.close()
+
+        cache = ResultCache(self.path, ttl=-1)
+        self.assertEqual(cache.get_unchanged("v", {1: b"a"}), set())
+        cache.close()
+
+    def test_evict(self):
+        cache = ResultCache(self.path, max_entries=2)
+        cache.add("v", [(1, b"a")])
+        cache.add("v", [(2, b"b"), (3, b"c")])
+        cache.get_unchanged("v", {1: b"a"})
+        cache.evict()
+        self.assertEqual(cache.get_unchanged("v", {1: b"a", 2: b"b", 3: b"c"}), {1, 3})
+        cache.close()
+
+    def test_validator_version(self):
+        def validate(self):
+            assert self.total >= 0
+
+        version = get_validator_version(validate)
+        self.assertEqual(version, get_validator_version(validate))
+
+        def validate(self):
+            assert self.total > 0
+
+        self.assertNotEqual(version, get_validator_version(validate))
+
+
+class TestValidationCache(TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.sqlite3")
+
+        self.good = OrderWithFields.objects.create(total=5, refund=0, revenue=5)
+        OrderWithFields.objects.create(total=5, refund=2, revenue=3)
+        self.bad = OrderWithFields.objects.create(total=-5, refund=0, revenue=-5)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def check(self):
+        stats = {}
+        cache = ValidationCache(ResultCache(self.path))
+        errors = [
+            (name, obj.pk)
+            for name, obj, message in gen_consistency_errors(
+                gen_validators_by_model("custom_consistency.OrderWithFields"),
+                stats=stats,
+                cache=cache,
+            )
+        ]
+        cache.close()
+        return errors, stats
+
+    def test_skip_unchanged(self):
+        errors, stats = self.check()
+        self.assertEqual(
+            stats["check.custom_consistency.OrderWithFields.validate_revenue"], 3
+        )
+        self.assertNotIn(
+            "cached.custom_consistency.OrderWithFields.validate_revenue", stats
+        )
+
+        cached_errors, stats = self.check()
+        self.assertEqual(cached_errors, errors)
+        # only the failed object is checked again
+        self.assertEqual(
+            stats["check.custom_consistency.OrderWithFields.validate_revenue"], 1
+        )
+        self.assertEqual(
+            stats["cached.custom_consistency.OrderWithFields.validate_revenue"], 2
+        )
+
+        self.good.revenue = 4
+        self.good.save()
+        errors, stats = self.check()
+        self.assertIn(
+            (
+                "custom_consistency.OrderWithFields.validate_revenue.formula",
+                self.good.pk,
+            ),
+            errors,
+        )
+        self.assertEqual(
+            stats["cached.custom_consistency.OrderWithFields.validate_revenue"], 1
+        )
+        # the fields of validate_total are not changed
+        self.assertEqual(
+            stats["cached.custom_consistency.OrderWithFields.validate_total"], 2
+        )
+
+    def test_validators_without_fields_are_not_cached(self):
+        Order.objects.create(total=5, refund=0, revenue=5)
+        for _ in range(2):
+            stats = {}
+            cache = ValidationCache(ResultCache(self.path))
+            list(
+                gen_consistency_errors(
+                    gen_validators_by_model("tests.Order"), stats=stats, cache=cache
+                )
+            )
+            cache.close()
+        self.assertEqual(stats["check.tests.Order.validate_total"], 1)
+        self.assertNotIn("cached.tests.Order.validate_total", stats)
@@ -0,0 +1,478 @@
+import random
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from tests.custom_consistency.models import OrderWithFields
+from tests.models import Order, OrderItem
+
+from consistency_model import (
+    ConsistencyChecker,
+    RollingScan,
+    ScanCursors,
+    gen_consistency_errors,
+    gen_validators_by_func,
+    gen_validators_by_model,
+)
+from consistency_model.models import ConsistencyScanCursor
+from consistency_model.budget import ScanBudget
+from consistency_model.sampling import estimate_failure_rate, get_random_pks
+from consistency_model.tools import (
+    CONSISTENCY_CHECKERS,
+    get_validators_fields,
+    get_validators_query_options,
+)
+
+
+class TestCheckerChunks(TestCase):
+    def setUp(self) -> None:
+        for i in range(5):
+            Order.objects.create(total=5, refund=0, revenue=5)
+
+    def assertChunks(self, checker, sizes):
+        chunks = list(checker.gen_chunks())
+        self.assertEqual([len(c) for c in chunks], sizes)
+        return [obj.pk for chunk in chunks for obj in chunk]
+
+    def test_no_chunk_size(self):
+        checker = ConsistencyChecker(Order, limit=None)
+        pks = self.assertChunks(checker, [5])
+        self.assertEqual(
+            pks, list(Order.objects.order_by("-id").values_list("pk", flat=True))
+        )
+
+    def test_keyset_chunks(self):
+        all_pks = list(Order.objects.order_by("-id").values_list("pk", flat=True))
+
+        checker = ConsistencyChecker(Order, limit=None, chunk_size=2)
+        with self.assertNumQueries(3):
+            pks = self.assertChunks(checker, [2, 2, 1])
+        self.assertEqual(pks, all_pks)
+
+        checker = ConsistencyChecker(Order, limit=3, chunk_size=2)
+        pks = self.assertChunks(checker, [2, 1])
+        self.assertEqual(pks, all_pks[:3])
+
+        checker = ConsistencyChecker(Order, limit=None, order_by="id", chunk_size=2)
+        pks = self.assertChunks(checker, [2, 2, 1])
+        self.assertEqual(pks, all_pks[::-1])
+
+    def test_iterator_chunks(self):
+        all_pks = list(
+            Order.objects.order_by("-created_on").values_list("pk", flat=True)
+        )
+
+        checker = ConsistencyChecker(
+            Order, limit=4, order_by="-created_on", chunk_size=3
+        )
+        pks = self.assertChunks(checker, [3, 1])
+        self.assertEqual(pks, all_pks[:4])
+
+    def test_gen_consistency_errors_with_chunks(self):
+        last_order = Order.objects.order_by("id").first()
+        last_order.total = -100
+        last_order.save()
+
+        prev_checker = CONSISTENCY_CHECKERS.get(Order)
+        CONSISTENCY_CHECKERS[Order] = ConsistencyChecker(
+            Order, limit=None, chunk_size=2
+        )
+        try:
+            errors = [
+                (name, obj.pk)
+                for name, obj, message in gen_consistency_errors(
+                    create_validators="tests.Order"
+                )
+            ]
+        finally:
+            if prev_checker is None:
+                del CONSISTENCY_CHECKERS[Order]
+            else:
+                CONSISTENCY_CHECKERS[Order] = prev_checker
+
+        self.assertEqual(
+            errors,
+            [
+                ("tests.Order.validate_total", last_order.pk),
+                ("tests.Order.validate_revenue.formula", last_order.pk),
+            ],
+        )
+
+
+class TestValidatorsFields(TestCase):
+    def setUp(self) -> None:
+        OrderWithFields.objects.create(total=-5, refund=0, revenue=5)
+
+    def test_fields_union(self):
+        ((name, list_funcs),) = gen_validators_by_model(
+            "custom_consistency.OrderWithFields"
+        )
+        self.assertEqual(
+            sorted(get_validators_fields(list_funcs)), ["refund", "revenue", "total"]
+        )
+        self.assertIsNone(
+            get_validators_fields([OrderWithFields.validate_total, lambda s: 1])
+        )
+        self.assertIsNone(get_validators_fields([Order.validate_total]))
+
+    def test_only_declared_fields_are_loaded(self):
+        errors = list(
+            gen_consistency_errors(
+                create_validators="custom_consistency.OrderWithFields"
+            )
+        )
+        self.assertEqual(len(errors), 2)
+        for name, obj, message in errors:
+            self.assertEqual(obj.get_deferred_fields(), {"created_on"})
+
+
+class TestCheckerRelated(TestCase):
+    def setUp(self) -> None:
+        for i in range(3):
+            order = Order.objects.create(total=5, refund=0, revenue=5)
+            OrderItem.objects.create(order=order, name="item", price=5)
+            OrderItem.objects.create(order=order, name="item", price=5)
+
+    def test_select_related(self):
+        checker = ConsistencyChecker(OrderItem, select_related=["order"])
+        with self.assertNumQueries(1):
+            totals = [item.order.total for item in checker.get_objects()]
+        self.assertEqual(len(totals), 6)
+
+        with self.assertNumQueries(1):
+            items = list(checker.get_objects(fields=["price"]))
+            totals = [item.order.total for item in items]
+        self.assertEqual(items[0].get_deferred_fields(), {"name"})
+
+    def test_prefetch_related_by_chunks(self):
+        checker = ConsistencyChecker(Order, chunk_size=2)
+        # orders + items for every chunk
+        with self.assertNumQueries(4):
+            counts = [
+                len(order.orderitem_set.all())
+                for order in checker.get_objects(prefetch_related=["orderitem_set"])
+            ]
+        self.assertEqual(counts, [2, 2, 2])
+
+        checker = ConsistencyChecker(
+            Order,
+            chunk_size=2,
+            order_by="-created_on",
+            prefetch_related=["orderitem_set"],
+        )
+        # one streamed query for orders + items for every chunk
+        with self.assertNumQueries(3):
+            counts = [len(order.orderitem_set.all()) for order in checker.get_objects()]
+        self.assertEqual(counts, [2, 2, 2])
+
+    def test_prefetch_related_with_fields(self):
+        checker = ConsistencyChecker(OrderItem, prefetch_related=["order"])
+        # items + orders, the order_id is not deferred
+        with self.assertNumQueries(2):
+            items = list(checker.get_objects(fields=["price"]))
+            totals = [item.order.total for item in items]
+        self.assertEqual(len(totals), 6)
+        self.assertEqual(items[0].get_deferred_fields(), {"name"})
+
+    def test_validators_query_options(self):
+        def validate_order(self):
+            pass
+
+        validate_order.consistency_fields = ("price",)
+        validate_order.consistency_select_related = ("order",)
+        validate_order.consistency_prefetch_related = ()
+
+        self.assertEqual(
+            get_validators_query_options([validate_order]),
+            {"fields": ["price"], "select_related": ["order"]},
+        )
+        self.assertEqual(get_validators_query_options([lambda s: 1]), {})
+
+
+class TestCheckerShards(TestCase):
+    def setUp(self) -> None:
+        for i in range(5):
+            Order.objects.create(total=5, refund=0, revenue=5)
+        self.pks = list(Order.objects.order_by("-id").values_list("pk", flat=True))
+
+    def test_limit_shards(self):
+        checker = ConsistencyChecker(Order, limit=4)
+        shards = checker.get_shards(2)
+        self.assertEqual(shards, [("pks", self.pks[:2]), ("pks", self.pks[2:4])])
+
+        shard_checker = checker.get_shard(shards[1])
+        self.assertEqual([o.pk for o in shard_checker.get_objects()], self.pks[2:4])
+        self.assertEqual(checker.limit, 4)
+
+    def test_range_shards(self):
+        checker = ConsistencyChecker(Order, limit=None)
+        shards = checker.get_shards(2)
+        first, last = self.pks[-1], self.pks[0]
+        self.assertEqual(
+            shards, [("range", first + 3, last), ("range", first, first + 2)]
+        )
+        pks = [
+            obj.pk for shard in shards for obj in checker.get_shard(shard).get_objects()
+        ]
+        self.assertEqual(pks, self.pks)
+
+        Order.objects.all().delete()
+        self.assertEqual(checker.get_shards(2), [])
+
+
+class TestScanBudget(TestCase):
+    def setUp(self) -> None:
+        for i in range(5):
+            Order.objects.create(total=5, refund=0, revenue=5)
+
+    @mock.patch("consistency_model.budget.time")
+    def test_pace(self, time_mock):
+        time_mock.monotonic.return_value = 100.0
+        budget = ScanBudget(max_seconds=10, max_rows_per_second=100)
+
+        time_mock.monotonic.return_value = 101.0
+        self.assertTrue(budget.pace(300))
+        time_mock.sleep.assert_called_once_with(2.0)
+
+        time_mock.monotonic.return_value = 110.0
+        self.assertFalse(budget.pace(10))
+        self.assertTrue(budget.exhausted)
+
+    @mock.patch("consistency_model.budget.time")
+    def test_stop_between_chunks(self, time_mock):
+        time_mock.monotonic.return_value = 100.0
+        budget = ScanBudget(max_seconds=10)
+        checker = ConsistencyChecker(Order, limit=None, chunk_size=2)
+
+        chunks = []
+        for chunk in budget.gen_chunks(checker.gen_chunks()):
+            chunks.append(chunk)
+            time_mock.monotonic.return_value = 110.0
+        self.assertEqual([len(chunk) for chunk in chunks], [2])
+        self.assertEqual(budget.rows, 2)
+
+
+class TestResumableScan(TestCase):
+    def setUp(self) -> None:
+        for i in range(5):
+            Order.objects.create(total=-1, refund=0, revenue=-1)
+        self.pks = list(Order.objects.order_by("-id").values_list("pk", flat=True))
+
+    def gen_errors(self, cursors, stats=None):
+        return gen_consistency_errors(
+            gen_validators_by_func("tests.Order.validate_revenue"),
+            stats=stats,
+            checkers={Order: ConsistencyChecker(Order, limit=None, chunk_size=2)},
+            cursors=cursors,
+        )
+
+    def test_resume(self):
+        errors = self.gen_errors(ScanCursors("test"), {})
+        # the scan is stopped in the second chunk
+        pks = [obj.pk for _, obj, _ in (next(errors) for i in range(3))]
+        errors.close()
+        self.assertEqual(pks, self.pks[:3])
+
+        cursor = ConsistencyScanCursor.objects.get(name="test")
+        self.assertEqual(cursor.object_id, str(self.pks[1]))
+
+        stats = {}
+        pks = [obj.pk for _, obj, _ in self.gen_errors(ScanCursors("test"), stats)]
+        self.assertEqual(pks, self.pks[2:])
+        # the stats of the first chunk are saved with the cursor
+        self.assertEqual(stats["check.tests.Order.validate_revenue"], 5)
+        self.assertEqual(stats["ERR.tests.Order.validate_revenue"], 5)
+
+        # the finished scan starts from the beginning
+        self.assertFalse(ConsistencyScanCursor.objects.exists())
+        pks = [obj.pk for _, obj, _ in self.gen_errors(ScanCursors("test"))]
+        self.assertEqual(pks, self.pks)
+
+    def test_resume_limit_window(self):
+        def gen_errors():
+            return gen_consistency_errors(
+                gen_validators_by_func("tests.Order.validate_revenue"),
+                checkers={Order: ConsistencyChecker(Order, limit=3, chunk_size=2)},
+                cursors=ScanCursors("test"),
+            )
+
+        errors = gen_errors()
+        pks = [obj.pk for _, obj, _ in (next(errors) for i in range(3))]
+        errors.close()
+        self.assertEqual(pks, self.pks[:3])
+        cursor = ConsistencyScanCursor.objects.get(name="test")
+        self.assertEqual(cursor.last_object_id, str(self.pks[2]))
+
+        # the resumed scan finishes the window of the first 3 objects
+        Order.objects.create(total=-1, refund=0, revenue=-1)
+        pks = [obj.pk for _, obj, _ in gen_errors()]
+        self.assertEqual(pks, self.pks[2:3])
+        self.assertFalse(ConsistencyScanCursor.objects.exists())
+
+    def test_not_resumable_order(self):
+        checker = ConsistencyChecker(Order, order_by="-created_on")
+        self.assertFalse(checker.is_resumable())
+        errors = list(
+            gen_consistency_errors(
+                gen_validators_by_func("tests.Order.validate_total"),
+                checkers={Order: checker},
+                cursors=ScanCursors("test"),
+            )
+        )
+        self.assertEqual(len(errors), 5)
+        self.assertFalse(ConsistencyScanCursor.objects.exists())
+
+
+class TestCheckerSample(TestCase):
+    def setUp(self) -> None:
+        for i in range(20):
+            Order.objects.create(total=5 if i % 4 else -5, refund=0, revenue=5)
+        # gaps in the pk sequence
+        pks = list(Order.objects.order_by("pk").values_list("pk", flat=True))
+        Order.objects.filter(pk__in=pks[::2]).delete()
+        self.pks = set(Order.objects.values_list("pk", flat=True))
+        # a local seeded generator, the global one is not touched
+        patcher = mock.patch("consistency_model.sampling.random", random.Random(0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_random_pks(self):
+        pks = get_random_pks(Order.objects.all(), 5)
+        self.assertEqual(len(set(pks)), 5)
+        self.assertTrue(set(pks) <= self.pks)
+
+        self.assertEqual(set(get_random_pks(Order.objects.all(), 100)), self.pks)
+        self.assertEqual(get_random_pks(Order.objects.none(), 5), [])
+
+    def test_sample(self):
+        checker = ConsistencyChecker(Order, sample_size=4)
+        shards = checker.get_shards(2)
+        self.assertEqual([len(shard[1]) for shard in shards], [2, 2])
+
+        stats = {}
+        errors = list(
+            gen_consistency_errors(
+                gen_validators_by_func("tests.Order.validate_total"),
+                stats=stats,
+                checkers={Order: checker},
+            )
+        )
+        self.assertEqual(stats["sample.tests.Order"], 4)
+        self.assertEqual(stats["check.tests.Order.validate_total"] - len(errors), 4)
+
+    def test_estimate_failure_rate(self):
+        rate, low, high = estimate_failure_rate(50, 100)
+        self.assertEqual(rate, 0.5)
+        self.assertAlmostEqual(low, 0.4038, places=4)
+        self.assertAlmostEqual(high, 0.5962, places=4)
+
+        rate, low, high = estimate_failure_rate(0, 100)
+        self.assertEqual((rate, low), (0.0, 0.0))
+        self.assertAlmostEqual(high, 0.037, places=3)
+
+
+class TestRollingScan(TestCase):
+    def setUp(self) -> None:
+        for i in range(8):
+            Order.objects.create(total=-5, refund=0, revenue=-5)
+        self.pks = list(Order.objects.order_by("pk").values_list("pk", flat=True))
+
+    def check_bucket(self, checker=None, budget=None, on_error=None):
+        rolling = RollingScan()
+        if checker is None:
+            checker = ConsistencyChecker(Order, rolling_buckets=3)
+        pks = []
+        for _, obj, _ in gen_consistency_errors(
+            gen_validators_by_func("tests.Order.validate_total"),
+            checkers={Order: checker},
+            budget=budget,
+            rolling=rolling,
+        ):
+            pks.append(obj.pk)
+            if on_error is not None:
+                on_error()
+        return sorted(pks), rolling.format_plans()
+
+    def test_buckets(self):
+        first = self.pks[0]
+        self.assertEqual(
+            self.check_bucket(),
+            (self.pks[:3], "tests.Order: bucket 1/3 pk {}-{}".format(first, first + 2)),
+        )
+        self.assertEqual(self.check_bucket()[0], self.pks[3:6])
+
+        # the last bucket has no upper bound
+        new_order = Order.objects.create(total=-5, refund=0, revenue=-5)
+        self.assertEqual(
+            self.check_bucket(),
+            (
+                self.pks[6:] + [new_order.pk],
+                "tests.Order: bucket 3/3 pk {}-".format(first + 6),
+            ),
+        )
+
+        # the next cycle is planned with the new pk range
+        self.assertEqual(self.check_bucket()[0], self.pks[:3])
+
+    @mock.patch("consistency_model.budget.time")
+    def test_budget_within_bucket(self, time_mock):
+        checker = ConsistencyChecker(
+            Order, rolling_buckets=2, order_by="id", chunk_size=3
+        )
+        time_mock.monotonic.return_value = 100.0
+        budget = ScanBudget(max_seconds=10)
+
+        def stop():
+            time_mock.monotonic.return_value = 110.0
+
+        # the time is over after the first chunk of the bucket
+        self.assertEqual(
+            self.check_bucket(checker, budget, on_error=stop)[0], self.pks[:3]
+        )
+        cursor = ConsistencyScanCursor.objects.get(name="rolling")
+        self.assertEqual((cursor.bucket, cursor.object_id), (0, str(self.pks[2])))
+
+        # the next run continues the bucket and moves to the next one
+        first = self.pks[0]
+        self.assertEqual(
+            self.check_bucket(checker),
+            (
+                self.pks[3:4],
+                "tests.Order: bucket 1/2 pk {}-{}".format(first, first + 3),
+            ),
+        )
+        cursor = ConsistencyScanCursor.objects.get(name="rolling")
+        self.assertEqual((cursor.bucket, cursor.object_id), (1, ""))
+        self.assertEqual(self.check_bucket(checker)[0], self.pks[4:])
+
+    def test_workers(self):
+        checker = ConsistencyChecker(Order, rolling_buckets=4)
+        with mock.patch.dict(CONSISTENCY_CHECKERS, {Order: checker}):
+            with self.assertRaisesMessage(CommandError, "tests.Order"):
+                call_command(
+                    "consistency_model_monitoring",
+                    "--filter",
+                    "tests.Order",
+                    "--workers",
+                    "2",
+                )
+
+    def test_monitoring_output(self):
+        prev_checker = CONSISTENCY_CHECKERS.get(Order)
+        CONSISTENCY_CHECKERS[Order] = ConsistencyChecker(Order, rolling_buckets=4)
+        try:
+            out = StringIO()
+            call_command(
+                "consistency_model_monitoring", "--filter", "tests.Order", stdout=out
+            )
+        finally:
+            if prev_checker is None:
+                del CONSISTENCY_CHECKERS[Order]
+            else:
+                CONSISTENCY_CHECKERS[Order] = prev_checker
+        self.assertIn(
+            "tests.Order: bucket 1/4 pk {}-{}".format(self.pks[0], self.pks[1]),
+            out.getvalue(),
+        )
@@ -1,11 +1,47 @@
+import csv
+import datetime
+import json
+import os
+import pstats
+import signal
+import subprocess
+import sys
+import tempfile
 from io import StringIO
 
-from django.test import TestCase
+from unittest import mock
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save
+from django.test import SimpleTestCase, TestCase
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+from django.contrib.contenttypes.models import ContentType
 
 from tests.models import Order
 from tests.subapp.models import Store
-from consistency_model.models import ConsistencyFail
+from consistency_model import (
+    ValidationPlan,
+    gen_validators,
+    gen_validators_by_func,
+    gen_validators_by_model,
+    monitoring_iteration,
+)
+from consistency_model.daemon import MonitoringDaemon
+from consistency_model.models import (
+    ConsistencyFail,
+    ConsistencyFailDaily,
+    ConsistencyScanCursor,
+)
+from consistency_model.signals import consistency_fails_created
+from consistency_model import tools
+from consistency_model.tools import (
+    CONSISTENCY_CHECKERS,
+    ConsistencyChecker,
+    get_register_consistency,
+)
 
 
 def call_command_stdout(*args):
@@ -45,6 +81,46 @@ class TestCheck(TestCase):
             in err
         )
 
+    def test_output_formats(self):
+        order = Order.objects.get(refund=5)
+        order.revenue = -1
+        order.save()
+
+        out, err = call_command_stdout(
+            "consistency_model_check", "--format", "jsonl", "--filter", "tests.Order"
+        )
+        assert "Stats:" in err
+        assert [json.loads(line) for line in out.splitlines()] == [
+            {
+                "validator": "tests.Order.validate_revenue",
+                "model": "tests.Order",
+                "pk": order.pk,
+                "error": "negative",
+                "message": "can't be negative",
+            },
+            {
+                "validator": "tests.Order.validate_revenue",
+                "model": "tests.Order",
+                "pk": order.pk,
+                "error": "formula",
+                "message": "revenue = total - refund",
+            },
+        ]
+
+        out, err = call_command_stdout(
+            "consistency_model_check", "--format", "csv", "--filter", "tests.Order"
+        )
+        rows = list(csv.reader(out.splitlines()))
+        assert rows[0] == ["validator", "model", "pk", "error", "message"]
+        assert rows[1] == [
+            "tests.Order.validate_revenue",
+            "tests.Order",
+            str(order.pk),
+            "negative",
+            "can't be negative",
+        ]
+        assert len(rows) == 3
+
     def test_check_only_orders(self):
         obj = Store.objects.get(name="tools")
         obj.total_items = -10
@@ -81,6 +157,67 @@ class TestCheck(TestCase):
         )
         assert not err
 
+    def test_timings(self):
+        out, err = call_command_stdout("consistency_model_check", "--timings")
+        assert "Timings:" in out
+        assert "model tests.Order: count=3 errors=0" in out
+        assert "validator tests.Order.validate_total: count=3 errors=0" in out
+
+    def test_queries(self):
+        out, err = call_command_stdout("consistency_model_check", "--queries")
+        assert "Queries:" in out
+        assert "tests.Order.validate_total: count=3 queries=0" in out
+        assert "N+1" not in out
+
+    def test_profile(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "check.prof")
+            out, err = call_command_stdout(
+                "consistency_model_check", "--profile", path, "--profile-models"
+            )
+            assert "Profile:" in out
+            assert path + ".tests.Order" in out
+
+            functions = {
+                func_name for _, _, func_name in pstats.Stats(path).stats.keys()
+            }
+            assert "validate_total" in functions
+            assert "validate_total_items" in functions
+
+            functions = {
+                func_name
+                for _, _, func_name in pstats.Stats(path + ".tests.Order").stats.keys()
+            }
+            assert "validate_total" in functions
+            assert "validate_total_items" not in functions
+
+            path = os.path.join(tmp, "monitoring.prof")
+            out, err = call_command_stdout(
+                "consistency_model_monitoring", "--profile", path
+            )
+            assert out.strip() == path
+            functions = {
+                func_name for _, _, func_name in pstats.Stats(path).stats.keys()
+            }
+            assert "monitoring_iteration" in functions
+
+    def test_sample(self):
+        out, err = call_command_stdout(
+            "consistency_model_check", "--sample", "2", "--filter", "tests.Order"
+        )
+        assert "sample.tests.Order:2" in out
+        assert "Estimates:" in out
+        assert "tests.Order.validate_total: failures=0/2 rate=0.00%" in out
+
+    def test_workers(self):
+        obj = Store.objects.get(name="tools")
+        obj.total_items = -10
+        obj.save()
+
+        serial = call_command_stdout("consistency_model_check")
+        in_workers = call_command_stdout("consistency_model_check", "--workers", "1")
+        self.assertEqual(serial, in_workers)
+
     def test_single_object(self):
         obj = Store.objects.get(name="tools")
         obj.total_items = -10
@@ -110,6 +247,53 @@ class TestCheck(TestCase):
         assert not err
 
 
+class TestWorkersPool(SimpleTestCase):
+    def group_errors(self, errors):
+        # (validator, lines of the errors) for every run of errors of the same validator,
+        # objects of a query validator come in the order of the DB
+        groups = []
+        for line in errors.splitlines():
+            if not line:
+                continue
+            validator_name = line.split(" ")[0]
+            if not groups or groups[-1][0] != validator_name:
+                groups.append((validator_name, set()))
+            groups[-1][1].add(line)
+        return groups
+
+    def test_pool(self):
+        # the workers can't see the in-memory DB of the tests,
+        # the check runs in a new process with a file-backed DB
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "tests.run_workers",
+                    os.path.join(tmp_dir, "db.sqlite3"),
+                ],
+                stdout=subprocess.PIPE,
+                check=True,
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            ).stdout
+        result = json.loads(output)
+        serial, workers = result["serial"], result["workers"]
+
+        self.assertEqual(serial["stats"], workers["stats"])
+        self.assertIn("ERR.tests.Order.validate_total:10", workers["stats"])
+        self.assertEqual(
+            self.group_errors(serial["errors"]), self.group_errors(workers["errors"])
+        )
+        # the errors of the query validator follow the python validators of the model
+        self.assertEqual(
+            [name for name, _ in self.group_errors(workers["errors"])][-2:],
+            [
+                "custom_consistency.OrderWithQueryCheck.validate_total",
+                "custom_consistency.OrderWithQueryCheck.validate_revenue",
+            ],
+        )
+
+
 class TestMonitoring(TestCase):
     def setUp(self) -> None:
         Order.objects.create(total=5, refund=0, revenue=5)
@@ -121,8 +305,8 @@ class TestMonitoring(TestCase):
 
     def assertUnresolvedFails(self, check):
         unresolved_checks = [
-            (f.validator_name, f.object_id)
-            for f in ConsistencyFail.objects.filter(resolved=False)
+            (f.validator_name, int(f.object_id))
+            for f in ConsistencyFail.objects.filter(resolved=False).order_by("pk")
         ]
         self.assertEqual(unresolved_checks, check)
 
@@ -247,3 +431,452 @@ class TestMonitoring(TestCase):
 
         call_command("consistency_model_monitoring")
         self.assertUnresolvedFails([])
+
+    def test_workers(self):
+        obj = Store.objects.get(name="tools")
+        obj.total_items = -10
+        obj.save()
+
+        call_command("consistency_model_monitoring", "--workers", "1")
+        self.assertUnresolvedFails([("subapp.Store.validate_total_items", obj.pk)])
+
+        obj.total_items = 10
+        obj.save()
+
+        call_command("consistency_model_monitoring", "--workers", "1")
+        self.assertUnresolvedFails([])
+
+    @mock.patch("consistency_model.tools.MONITORING_MAX_SECONDS", 600)
+    def test_workers_without_budget(self):
+        # the budget of the settings is not used by the workers
+        call_command("consistency_model_monitoring", "--workers", "1")
+
+        with self.assertRaises(ValueError):
+            monitoring_iteration(workers=1, max_seconds=600)
+
+    def test_bulk_save(self):
+        orders = list(Order.objects.all())
+        for obj in orders:
+            obj.revenue = -10
+            obj.save()
+
+        created = []
+
+        def receiver(sender, fails, **kwargs):
+            created.extend(fails)
+
+        ContentType.objects.get_for_model(Order)
+        consistency_fails_created.connect(receiver)
+        try:
+            # select checkpoints, select orders, one upsert for each batch of 2 errors,
+            # select unresolved fails by batches of 2
+            with self.assertNumQueries(10):
+                monitoring_iteration(
+                    gen_validators_by_model("tests.Order"), batch_size=2
+                )
+        finally:
+            consistency_fails_created.disconnect(receiver)
+
+        self.assertEqual(len(created), 6)
+        self.assertEqual(ConsistencyFail.objects.filter(resolved=False).count(), 6)
+
+        orders[0].revenue = 100
+        orders[0].save()
+
+        monitoring_iteration(gen_validators_by_model("tests.Order"), batch_size=2)
+        self.assertEqual(ConsistencyFail.objects.filter(resolved=False).count(), 5)
+        self.assertEqual(ConsistencyFail.objects.count(), 6)
+
+    def test_bulk_save_post_save(self):
+        orders = list(Order.objects.all()[:2])
+        for obj in orders:
+            obj.total = -10
+            obj.save()
+
+        saved = []
+
+        def receiver(sender, instance, created, **kwargs):
+            saved.append((instance.object_id, created))
+
+        validators = ValidationPlan(
+            gen_validators_by_func("tests.Order.validate_total")
+        )
+        post_save.connect(receiver, sender=ConsistencyFail)
+        try:
+            monitoring_iteration(validators, batch_size=1)
+            self.assertEqual(
+                sorted(saved), sorted((str(obj.pk), True) for obj in orders)
+            )
+
+            ConsistencyFail.objects.update(resolved=True)
+            del saved[:]
+            with mock.patch("consistency_model.tools.MONITORING_POST_SAVE", False):
+                monitoring_iteration(validators)
+        finally:
+            post_save.disconnect(receiver, sender=ConsistencyFail)
+        self.assertEqual(saved, [])
+        self.assertEqual(ConsistencyFail.objects.filter(resolved=False).count(), 2)
+
+    def create_existing_fail(self, order):
+        # the fail created by another monitoring process
+        return ConsistencyFail.objects.create(
+            validator_name="tests.Order.validate_revenue.formula",
+            content_type=ContentType.objects.get_for_model(Order),
+            object_id=str(order.pk),
+            message="old message",
+        )
+
+    def test_unresolved_fail_is_unique(self):
+        order = Order.objects.first()
+        fail = self.create_existing_fail(order)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.create_existing_fail(order)
+
+        fail.resolve()
+        self.create_existing_fail(order)
+
+    def check_existing_fails(self):
+        order = Order.objects.first()
+        order.revenue = 100
+        order.save()
+        fail = self.create_existing_fail(order)
+
+        created = []
+
+        def receiver(sender, fails, **kwargs):
+            created.extend(fails)
+
+        consistency_fails_created.connect(receiver)
+        try:
+            monitoring_iteration(gen_validators_by_model("tests.Order"))
+        finally:
+            consistency_fails_created.disconnect(receiver)
+
+        self.assertUnresolvedFails([("tests.Order.validate_revenue.formula", order.pk)])
+        fail.refresh_from_db()
+        self.assertFalse(fail.resolved)
+        self.assertEqual(fail.message, "revenue = total - refund")
+        return created
+
+    def test_upsert_existing_fails(self):
+        self.assertEqual(self.check_existing_fails(), [])
+
+    def test_save_existing_fails_without_upsert(self):
+        with mock.patch(
+            "consistency_model.tools._supports_fails_upsert", return_value=False
+        ):
+            self.check_existing_fails()
+
+    def test_concurrent_fails_without_upsert(self):
+        orders = list(Order.objects.all())
+        for order in orders:
+            order.revenue = 100
+            order.save()
+        concurrent_fails = []
+        bulk_create = QuerySet.bulk_create
+
+        def concurrent_bulk_create(queryset, objs, *args, **kwargs):
+            if queryset.model is ConsistencyFail and not concurrent_fails:
+                # another monitoring creates the fail after it was looked up
+                concurrent_fails.append(self.create_existing_fail(orders[0]))
+            return bulk_create(queryset, objs, *args, **kwargs)
+
+        created = []
+
+        def receiver(sender, fails, **kwargs):
+            created.extend(fails)
+
+        consistency_fails_created.connect(receiver)
+        try:
+            with mock.patch(
+                "consistency_model.tools._supports_fails_upsert", return_value=False
+            ), mock.patch.object(QuerySet, "bulk_create", concurrent_bulk_create):
+                monitoring_iteration(gen_validators_by_model("tests.Order"))
+        finally:
+            consistency_fails_created.disconnect(receiver)
+
+        self.assertEqual(ConsistencyFail.objects.filter(resolved=False).count(), 3)
+        self.assertEqual(len(created), 2)
+        self.assertNotIn(concurrent_fails[0].pk, [fail.pk for fail in created])
+        self.assertTrue(all(fail.pk for fail in created))
+
+    def test_save_fails_without_partial_indexes(self):
+        order = Order.objects.first()
+        order.revenue = 100
+        order.save()
+
+        created = []
+
+        def receiver(sender, fails, **kwargs):
+            created.extend(fails)
+
+        consistency_fails_created.connect(receiver)
+        try:
+            with mock.patch(
+                "consistency_model.tools._supports_fails_upsert", return_value=False
+            ), mock.patch.object(
+                connection.features, "supports_partial_indexes", False
+            ), mock.patch.object(
+                QuerySet, "bulk_create", autospec=True, side_effect=QuerySet.bulk_create
+            ) as bulk_create_mock:
+                monitoring_iteration(gen_validators_by_model("tests.Order"))
+        finally:
+            consistency_fails_created.disconnect(receiver)
+
+        # INSERT IGNORE of MySQL would skip other errors as well
+        self.assertNotIn("ignore_conflicts", bulk_create_mock.call_args[1])
+        self.assertUnresolvedFails([("tests.Order.validate_revenue.formula", order.pk)])
+        self.assertEqual([fail.object_id for fail in created], [str(order.pk)])
+
+    def test_bulk_recheck(self):
+        orders = list(Order.objects.all())
+        for obj in orders:
+            obj.revenue = -10
+            obj.save()
+
+        monitoring_iteration(gen_validators_by_model("tests.Order"))
+        self.assertEqual(ConsistencyFail.objects.filter(resolved=False).count(), 6)
+
+        orders[0].delete()
+        for obj in orders[1:]:
+            obj.revenue = 5 - obj.refund
+            obj.save()
+
+        ContentType.objects.get_for_model(Order)
+        # select checkpoints, select orders, select groups of unresolved fails,
+        # select fails, select objects, resolve fails, select next fails
+        with self.assertNumQueries(7):
+            monitoring_iteration(gen_validators_by_model("tests.Order"))
+
+        self.assertEqual(ConsistencyFail.objects.filter(resolved=False).count(), 0)
+        self.assertEqual(
+            ConsistencyFail.objects.filter(resolved_on__isnull=False).count(), 6
+        )
+
+    def test_resume(self):
+        call_command("consistency_model_monitoring", "--resume")
+        self.assertUnresolvedFails([])
+        out, err = call_command_stdout("consistency_model_check", "--resume")
+        assert "check.tests.Order.validate_total:3" in out
+        # the finished scans don't keep the cursors
+        self.assertFalse(ConsistencyScanCursor.objects.exists())
+
+    def test_max_seconds_keeps_not_rechecked_fails(self):
+        for obj in Order.objects.all():
+            obj.revenue = -10
+            obj.save()
+
+        call_command("consistency_model_monitoring")
+        self.assertEqual(ConsistencyFail.objects.filter(resolved=False).count(), 6)
+
+        Order.objects.update(revenue=5)
+        Order.objects.filter(refund__gt=0).delete()
+
+        # the time is over before anything is checked
+        call_command("consistency_model_monitoring", "--max-seconds", "0")
+        self.assertEqual(ConsistencyFail.objects.filter(resolved=False).count(), 6)
+
+        call_command("consistency_model_monitoring", "--max-rows-per-second", "1000")
+        self.assertEqual(ConsistencyFail.objects.filter(resolved=False).count(), 0)
+
+    def test_recheck_only_filtered_validators(self):
+        order = Order.objects.first()
+        order.total = -10
+        order.save()
+        store = Store.objects.first()
+        store.total_items = -10
+        store.save()
+
+        call_command("consistency_model_monitoring")
+        self.assertEqual(ConsistencyFail.objects.filter(resolved=False).count(), 3)
+
+        order.total = 5
+        order.save()
+        store.total_items = 5
+        store.save()
+
+        call_command(
+            "consistency_model_monitoring",
+            "--filter",
+            "tests.Order",
+            "--exclude",
+            "tests.Order.validate_revenue",
+        )
+        self.assertUnresolvedFails(
+            [
+                ("tests.Order.validate_revenue.formula", order.pk),
+                ("subapp.Store.validate_total_items", store.pk),
+            ]
+        )
+
+        call_command("consistency_model_monitoring", "--filter", "subapp")
+        self.assertUnresolvedFails([("tests.Order.validate_revenue.formula", order.pk)])
+
+
+class TestPurge(TestCase):
+    def setUp(self) -> None:
+        content_type = ContentType.objects.get_for_model(Order)
+        now = timezone.now()
+        for i in range(5):
+            ConsistencyFail.objects.create(
+                validator_name="tests.Order.validate_total",
+                content_type=content_type,
+                object_id=str(i),
+                message="total >= 0",
+                resolved=True,
+                resolved_on=now - datetime.timedelta(days=40 + i % 2),
+            )
+        self.recent = ConsistencyFail.objects.create(
+            validator_name="tests.Order.validate_total",
+            content_type=content_type,
+            object_id="10",
+            message="total >= 0",
+            resolved=True,
+            resolved_on=now - datetime.timedelta(days=1),
+        )
+        self.unresolved = ConsistencyFail.objects.create(
+            validator_name="tests.Order.validate_total",
+            content_type=content_type,
+            object_id="11",
+            message="total >= 0",
+        )
+
+    def test_days_required(self):
+        with self.assertRaises(CommandError):
+            call_command("consistency_model_purge")
+
+    def test_purge(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "fails.jsonl")
+            out, err = call_command_stdout(
+                "consistency_model_purge",
+                "--days",
+                "30",
+                "--batch-size",
+                "2",
+                "--rollup",
+                "--archive",
+                path,
+            )
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+
+        assert "Deleted 5 resolved fails" in out
+        self.assertEqual(
+            set(ConsistencyFail.objects.values_list("pk", flat=True)),
+            {self.recent.pk, self.unresolved.pk},
+        )
+        self.assertEqual([r["object_id"] for r in records], ["0", "1", "2", "3", "4"])
+        self.assertEqual(records[0]["model"], "tests.order")
+        self.assertEqual(
+            sorted(ConsistencyFailDaily.objects.values_list("resolved", flat=True)),
+            [2, 3],
+        )
+
+        # nothing else to purge
+        out, err = call_command_stdout("consistency_model_purge", "--days", "30")
+        assert "Deleted 0 resolved fails" in out
+
+    def test_max_seconds(self):
+        out, err = call_command_stdout(
+            "consistency_model_purge", "--days", "30", "--max-seconds", "0"
+        )
+        assert "Deleted 0 resolved fails" in out
+        self.assertEqual(ConsistencyFail.objects.count(), 7)
+
+
+class TestMonitoringDaemon(TestCase):
+    def setUp(self) -> None:
+        self.signal_handlers = {
+            signum: signal.getsignal(signum)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+
+    def tearDown(self) -> None:
+        for signum, handler in self.signal_handlers.items():
+            signal.signal(signum, handler)
+
+    def test_intervals(self):
+        daemon = MonitoringDaemon(
+            gen_validators(["tests.Order", "subapp.Store"]), jitter=0
+        )
+        checked = []
+
+        def iteration(validators, **kwargs):
+            checked.extend(name for name, funcs in validators)
+            if len(checked) == 5:
+                daemon.stop()
+
+        with mock.patch.object(
+            get_register_consistency(Order), "interval", 0.01
+        ), mock.patch.object(
+            get_register_consistency(Store), "interval", 60
+        ), mock.patch(
+            "consistency_model.daemon.monitoring_iteration", side_effect=iteration
+        ):
+            daemon.run()
+
+        self.assertEqual(checked[:2], [("tests", "Order"), ("subapp", "Store")])
+        self.assertEqual(checked[2:], [("tests", "Order")] * 3)
+
+    def test_failed_model_does_not_stop_daemon(self):
+        daemon = MonitoringDaemon(gen_validators(["tests.Order", "subapp.Store"]))
+        checked = []
+
+        def iteration(validators, **kwargs):
+            checked.extend(name for name, funcs in validators)
+            if len(checked) == 2:
+                daemon.stop()
+            raise ValueError("DB is down")
+
+        with mock.patch(
+            "consistency_model.daemon.monitoring_iteration", side_effect=iteration
+        ):
+            daemon.run()
+        self.assertEqual(len(checked), 2)
+
+    def test_stop_between_chunks(self):
+        orders = [Order.objects.create(total=-1, revenue=-1) for i in range(5)]
+        daemon = MonitoringDaemon(
+            gen_validators_by_func("tests.Order.validate_total"),
+            batch_size=1,
+            resume=True,
+        )
+        save_fails = tools._save_consistency_fails
+
+        def save_and_stop(errors, batch_size):
+            save_fails(errors, batch_size)
+            daemon.stop()
+
+        checker = ConsistencyChecker(Order, chunk_size=1)
+        with mock.patch.dict(CONSISTENCY_CHECKERS, {Order: checker}), mock.patch(
+            "consistency_model.tools._save_consistency_fails",
+            side_effect=save_and_stop,
+        ):
+            daemon.run()
+
+        # the scan is stopped after the first chunk and continues from the cursor
+        self.assertEqual(
+            list(ConsistencyFail.objects.values_list("object_id", flat=True)),
+            [str(orders[-1].pk)],
+        )
+        cursor = ConsistencyScanCursor.objects.get(name="monitoring")
+        self.assertEqual(cursor.object_id, str(orders[-1].pk))
+
+    def test_sigterm(self):
+        Order.objects.create(total=5, refund=0, revenue=-10)
+
+        def iteration(validators, **kwargs):
+            monitoring_iteration(validators, **kwargs)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+        with mock.patch(
+            "consistency_model.daemon.monitoring_iteration", side_effect=iteration
+        ) as iteration_mock:
+            call_command(
+                "consistency_model_monitoring", "--daemon", "--filter", "tests.Order"
+            )
+
+        # the first model is finished and the daemon is stopped
+        self.assertEqual(iteration_mock.call_count, 1)
+        self.assertTrue(ConsistencyFail.objects.filter(resolved=False).exists())
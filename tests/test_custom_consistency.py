@@ -1,10 +1,20 @@
 from django.test import TestCase
 
 from consistency_model import (
+    ConsistencyChecker,
     gen_consistency_errors,
+    monitoring_iteration,
+    register_consistency,
+)
+from consistency_model.models import ConsistencyFail, ConsistencyCheckpoint
+from consistency_model.tools import CONSISTENCY_CHECKERS
+
+from tests.custom_consistency.models import (
+    OrderWithLastCheck,
+    OrderWithSkipCheck,
+    OrderWithQueryCheck,
+    OrderWithIncrementalCheck,
 )
-
-from tests.custom_consistency.models import OrderWithLastCheck, OrderWithSkipCheck
 
 
 class TestOrderWithLastCheck(TestCase):
@@ -70,3 +80,142 @@ class TestOrderWithSkipCheck(TestCase):
             create_validators="custom_consistency.OrderWithSkipCheck",
         )
         assert not list(errors)
+
+
+class TestOrderWithQueryCheck(TestCase):
+    def setUp(self) -> None:
+        OrderWithQueryCheck.objects.create(total=5, refund=0, revenue=5)
+        OrderWithQueryCheck.objects.create(total=5, refund=5, revenue=0)
+        OrderWithQueryCheck.objects.create(total=5, refund=2, revenue=3)
+
+    def get_errors(self, **kwargs):
+        return [
+            (name, obj.pk, message)
+            for name, obj, message in gen_consistency_errors(
+                create_validators="custom_consistency.OrderWithQueryCheck", **kwargs
+            )
+        ]
+
+    def test_all_good(self):
+        stats = {}
+        self.assertEqual(self.get_errors(stats=stats), [])
+        self.assertEqual(
+            stats,
+            {
+                "check.custom_consistency.OrderWithQueryCheck.validate_total": 3,
+                "check.custom_consistency.OrderWithQueryCheck.validate_revenue": 3,
+            },
+        )
+
+    def test_fail(self):
+        order = OrderWithQueryCheck.objects.last()
+        order.revenue = 100
+        order.save()
+
+        # one query for python validator, pks of the checked rows
+        # and inconsistent rows for query validator
+        with self.assertNumQueries(3):
+            errors = self.get_errors(stats={})
+        self.assertEqual(
+            errors,
+            [
+                (
+                    "custom_consistency.OrderWithQueryCheck.validate_revenue",
+                    order.pk,
+                    "revenue = total - refund",
+                )
+            ],
+        )
+
+        self.assertEqual(
+            self.get_errors(objects=OrderWithQueryCheck.objects.exclude(pk=order.pk)),
+            [],
+        )
+        self.assertEqual(
+            [e[1] for e in self.get_errors(objects=[order])],
+            [order.pk],
+        )
+
+    def test_monitoring(self):
+        order = OrderWithQueryCheck.objects.last()
+        order.revenue = 100
+        order.save()
+
+        monitoring_iteration()
+        self.assertEqual(
+            list(
+                ConsistencyFail.objects.filter(resolved=False).values_list(
+                    "validator_name", "object_id"
+                )
+            ),
+            [
+                (
+                    "custom_consistency.OrderWithQueryCheck.validate_revenue",
+                    str(order.pk),
+                )
+            ],
+        )
+
+        order.revenue = 3
+        order.save()
+
+        monitoring_iteration()
+        self.assertFalse(ConsistencyFail.objects.filter(resolved=False).exists())
+
+
+class TestOrderWithIncrementalCheck(TestCase):
+    def setUp(self) -> None:
+        for name in ("first", "second", "third"):
+            OrderWithIncrementalCheck.objects.create(name=name, total_items=-1)
+
+    def get_checked(self, checkpoints):
+        return [
+            obj.name
+            for name, obj, message in gen_consistency_errors(
+                create_validators="custom_consistency.OrderWithIncrementalCheck",
+                checkpoints=checkpoints,
+            )
+        ]
+
+    def test_checkpoints(self):
+        checkpoints = {}
+        self.assertEqual(self.get_checked(checkpoints), ["first", "second"])
+        self.assertEqual(len(checkpoints), 1)
+        self.assertEqual(self.get_checked(checkpoints), ["third"])
+        self.assertEqual(self.get_checked(checkpoints), [])
+
+        order = OrderWithIncrementalCheck.objects.get(name="first")
+        order.save()
+        self.assertEqual(self.get_checked(checkpoints), ["first"])
+
+    def test_without_checkpoints(self):
+        self.assertEqual(self.get_checked(None), ["third", "second"])
+
+    def test_nullable_field(self):
+        # the rows with NULL would never be after the checkpoint
+        with self.assertRaises(ValueError):
+            register_consistency(ConsistencyFail, incremental_field="resolved_on")
+        self.assertNotIn(ConsistencyFail, CONSISTENCY_CHECKERS)
+
+        checker = ConsistencyChecker(ConsistencyFail, incremental_field="resolved_on")
+        with self.assertRaises(ValueError):
+            checker.get_incremental_queryset()
+
+    def test_monitoring(self):
+        monitoring_iteration()
+        self.assertEqual(ConsistencyCheckpoint.objects.count(), 1)
+        self.assertEqual(
+            ConsistencyFail.objects.filter(
+                validator_name__startswith="custom_consistency.OrderWithIncrementalCheck"
+            ).count(),
+            2,
+        )
+
+        monitoring_iteration()
+        self.assertEqual(
+            ConsistencyFail.objects.filter(
+                validator_name__startswith="custom_consistency.OrderWithIncrementalCheck",
+                resolved=False,
+            ).count(),
+            3,
+        )